@@ -0,0 +1,232 @@
+import asyncio
+import glob
+import gzip
+import hashlib
+import json
+import os
+import time
+from collections import defaultdict, deque
+from typing import Any, Deque, Dict, List, Optional
+
+from utils.model_clients import ModelClient, ModelResponse
+from utils.profiling import profiler
+
+
+class CassetteMiss(LookupError):
+    """Replay was asked for a request that was never recorded"""
+
+
+class ReplayedError(RuntimeError):
+    """A provider error captured while recording, raised again on replay"""
+
+
+def request_key(provider: str, method: str, payload: Any) -> str:
+    canonical = json.dumps([provider, method, payload], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()[:24]
+
+
+class Cassette:
+    """Recorded provider traffic: one gzipped JSON line per request.
+
+    Entries are keyed by (provider, method, request payload). Identical
+    requests are replayed in the order they were recorded, so a scenario that
+    sends the same prompt twice gets both original answers back regardless of
+    how its coroutines interleave.
+
+    While recording, each process appends to its own shard (`<path>.<pid>`)
+    and flushes after every entry, so worker processes that exit without
+    running atexit handlers, or crash, keep what they recorded. load()
+    merges `path` and all of its shards.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries: List[Dict[str, Any]] = []
+        self._pending: Dict[str, Deque[Dict[str, Any]]] = defaultdict(deque)
+        self._started = time.perf_counter()
+        self._file = None
+        self._file_pid: Optional[int] = None
+
+    @staticmethod
+    def files(path: str) -> List[str]:
+        """The merged cassette at `path` (if any) followed by every per-process shard"""
+        shards = sorted(glob.glob(glob.escape(path) + ".[0-9]*"))
+        return ([path] if os.path.exists(path) else []) + shards
+
+    @classmethod
+    def load(cls, path: str) -> "Cassette":
+        files = cls.files(path)
+        if not files:
+            raise FileNotFoundError(f"No cassette or cassette shards at {path}")
+        cassette = cls(path)
+        for file in files:
+            cassette._read(file)
+        return cassette
+
+    def _read(self, file: str):
+        try:
+            with gzip.open(file, "rt") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self.entries.append(entry)
+                        self._pending[entry["key"]].append(entry)
+        except (EOFError, json.JSONDecodeError):
+            # A recorder that died mid-write leaves a truncated tail; keep every entry before it
+            pass
+
+    @classmethod
+    def merge(cls, path: str) -> "Cassette":
+        """Combine `path` and its shards into a single file at `path` and remove the shards"""
+        cassette = cls.load(path)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with gzip.open(path + ".tmp", "wt") as f:
+            for entry in cassette.entries:
+                f.write(json.dumps(entry, separators=(",", ":")))
+                f.write("\n")
+        os.replace(path + ".tmp", path)
+        for file in cls.files(path)[1:]:
+            os.remove(file)
+        return cassette
+
+    @property
+    def providers(self) -> List[str]:
+        return list(dict.fromkeys(entry["provider"] for entry in self.entries))
+
+    def record(self, provider: str, method: str, payload: Any, start: float, latency: float,
+               response: Optional[str] = None, error: Optional[str] = None):
+        usage = getattr(response, "usage", None)
+        entry = {
+            "key": request_key(provider, method, payload),
+            "provider": provider,
+            "method": method,
+            "offset": round(start - self._started, 6),
+            "latency": round(latency, 6),
+            "response": None if response is None else str(response),
+            "usage": usage,
+            "error": error
+        }
+        self.entries.append(entry)
+        self._append(entry)
+
+    def _append(self, entry: Dict[str, Any]):
+        # A forked child must not write into the shard its parent opened
+        if self._file is None or self._file_pid != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._file = gzip.open(f"{self.path}.{os.getpid()}", "at")
+            self._file_pid = os.getpid()
+        self._file.write(json.dumps(entry, separators=(",", ":")))
+        self._file.write("\n")
+        self._file.flush()
+
+    def close(self):
+        if self._file is not None and self._file_pid == os.getpid():
+            self._file.close()
+        self._file = None
+
+    def take(self, provider: str, method: str, payload: Any) -> Dict[str, Any]:
+        pending = self._pending.get(request_key(provider, method, payload))
+        if not pending:
+            raise CassetteMiss(f"No recorded {provider}.{method} response for this request in {self.path}")
+        return pending.popleft()
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        summary: Dict[str, Dict[str, float]] = {}
+        for entry in self.entries:
+            stats = summary.setdefault(entry["provider"], {"requests": 0, "errors": 0, "latency": 0.0})
+            stats["requests"] += 1
+            stats["errors"] += entry["error"] is not None
+            stats["latency"] += entry["latency"]
+        return summary
+
+
+def _packed_payload(packed) -> Dict[str, str]:
+    return {"prefix": packed.prefix, "body": packed.body}
+
+
+class RecordingClient(ModelClient):
+    """Passes requests through to a live client and records each one with its latency"""
+
+    def __init__(self, inner: ModelClient, cassette: Cassette, provider: str):
+        self.inner = inner
+        self.cassette = cassette
+        self.provider = provider
+
+    def __getattr__(self, name):
+        # Expose the wrapped client's SDK handles (e.g. AnthropicClient.client)
+        return getattr(self.inner, name)
+
+    async def _record(self, method: str, payload: Any, call) -> str:
+        start = time.perf_counter()
+        try:
+            response = await call
+        except Exception as e:
+            self.cassette.record(self.provider, method, payload, start, time.perf_counter() - start,
+                                 error=f"{type(e).__name__}: {e}")
+            raise
+        self.cassette.record(self.provider, method, payload, start, time.perf_counter() - start,
+                             response=response)
+        return response
+
+    async def generate_response(self, prompt: str) -> str:
+        return await self._record("generate_response", prompt, self.inner.generate_response(prompt))
+
+    async def generate_packed(self, packed) -> str:
+        return await self._record("generate_packed", _packed_payload(packed), self.inner.generate_packed(packed))
+
+    async def generate_chat(self, messages: List[Dict[str, str]]) -> str:
+        return await self._record("generate_chat", messages, self.inner.generate_chat(messages))
+
+
+class ReplayClient(ModelClient):
+    """Serves a provider's recorded responses without touching the network.
+
+    latency_scale multiplies the recorded latency before each answer: 1.0
+    reproduces the original timing, 0.1 runs ten times faster and 0 replays
+    as fast as possible.
+    """
+
+    client = None  # No SDK handle; evaluators that need one must not call the API on replay
+
+    def __init__(self, cassette: Cassette, provider: str, latency_scale: float = 0.0):
+        self.cassette = cassette
+        self.provider = provider
+        self.latency_scale = latency_scale
+
+    async def _replay(self, method: str, payload: Any) -> str:
+        with profiler.span(f"provider.replay.{self.provider}"):
+            entry = self.cassette.take(self.provider, method, payload)
+            if self.latency_scale > 0:
+                await asyncio.sleep(entry["latency"] * self.latency_scale)
+        if entry["error"] is not None:
+            raise ReplayedError(entry["error"])
+        if entry.get("usage"):
+            return ModelResponse(entry["response"], **entry["usage"])
+        return entry["response"]
+
+    async def generate_response(self, prompt: str) -> str:
+        return await self._replay("generate_response", prompt)
+
+    async def generate_packed(self, packed) -> str:
+        return await self._replay("generate_packed", _packed_payload(packed))
+
+    async def generate_chat(self, messages: List[Dict[str, str]]) -> str:
+        return await self._replay("generate_chat", messages)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Summarize a recorded provider cassette")
+    parser.add_argument("path")
+    parser.add_argument("--merge", action="store_true", help="Combine per-process shards into path")
+    args = parser.parse_args()
+
+    cassette = Cassette.merge(args.path) if args.merge else Cassette.load(args.path)
+    for provider, stats in cassette.summary().items():
+        print(f"{provider:10} {stats['requests']:6} requests  {stats['errors']:4} errors  "
+              f"{stats['latency']:8.1f}s recorded latency")
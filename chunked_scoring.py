@@ -0,0 +1,98 @@
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from utils.evaluator import EnhancedEvaluator
+from utils.profiling import profiler
+from utils.tokenization import (
+    TokenizedResponse, classifier_windows, classify_windows, tokenize_responses
+)
+
+
+class ChunkedClassifier:
+    """Scores arbitrarily long responses with overlapping classifier windows.
+
+    Every response is split into `window`-token windows overlapping by
+    `overlap` tokens (cut from the ids tokenize_responses already produced),
+    all windows from all responses are run through the classifier together
+    in `batch_size` chunks, and window scores are averaged per response
+    weighted by the number of tokens in each window. Cost is linear in
+    response length instead of quadratic.
+    """
+
+    def __init__(self, evaluator: EnhancedEvaluator, window: int = 512, overlap: int = 128,
+                 batch_size: int = 16):
+        if not 0 <= overlap < window - 2:
+            raise ValueError(f"overlap must be in [0, {window - 2}) for window={window}, got {overlap}")
+        self.evaluator = evaluator
+        self.window = window
+        self.overlap = overlap
+        self.batch_size = batch_size
+
+    @profiler.timed("chunked.score_tokenized")
+    def score_tokenized(self, responses: List[TokenizedResponse]) -> np.ndarray:
+        if not responses:
+            return np.zeros(0)
+        inputs, owners = classifier_windows(responses, self.window, self.overlap)
+        token_counts = np.array([len(ids) for ids in inputs], dtype=np.float64)
+        with profiler.span("chunked.forward"):
+            window_scores = classify_windows(self.evaluator.tokenizer, self.evaluator.sentiment_model,
+                                             inputs, self.batch_size)
+
+        weighted = np.bincount(owners, weights=window_scores * token_counts, minlength=len(responses))
+        totals = np.bincount(owners, weights=token_counts, minlength=len(responses))
+        return weighted / np.maximum(totals, 1)
+
+    def score_texts(self, texts: List[str]) -> np.ndarray:
+        return self.score_tokenized(tokenize_responses(texts, self.evaluator.tokenizer))
+
+
+def _synthetic_response(target_tokens: int, tokenizer) -> str:
+    paragraph = (
+        "ASSESSMENT: The earthquake has collapsed several buildings and damaged three hospitals. "
+        "DECISION: Deploy search and rescue teams to the school first because children are trapped, "
+        "and redirect patients to field hospitals. REASONING: Given limited resources, we prioritize "
+        "the most lives saved per hour of effort. CONSEQUENCES: Some non-critical patients will wait "
+        "longer, so we will monitor them and rebalance once international aid arrives. "
+    )
+    per_paragraph = len(tokenizer(paragraph)["input_ids"])
+    return paragraph * max(1, target_tokens // per_paragraph)
+
+
+def benchmark(evaluator: EnhancedEvaluator, lengths=(2000, 4000, 8000), responses_per_length: int = 8,
+              batch_size: int = 16) -> List[Dict[str, float]]:
+    """Compare per-response truncated scoring against batched chunked scoring"""
+    chunked = ChunkedClassifier(evaluator, batch_size=batch_size)
+    results = []
+    for length in lengths:
+        texts = [_synthetic_response(length, evaluator.tokenizer)] * responses_per_length
+
+        start = time.perf_counter()
+        for text in texts:
+            evaluator._evaluate_response_quality({"response": text})
+        truncated = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for text in texts:
+            chunked.score_texts([text])
+        per_response = time.perf_counter() - start
+
+        start = time.perf_counter()
+        chunked.score_texts(texts)
+        batched = time.perf_counter() - start
+
+        results.append({
+            "tokens": length,
+            "responses": responses_per_length,
+            "truncated_512_s": truncated,
+            "chunked_per_response_s": per_response,
+            "chunked_batched_s": batched
+        })
+        print(f"{length} tokens x {responses_per_length}: truncated {truncated:.2f}s, "
+              f"chunked per-response {per_response:.2f}s, chunked batched {batched:.2f}s")
+    return results
+
+
+if __name__ == "__main__":
+    benchmark(EnhancedEvaluator("benchmark", client=None))
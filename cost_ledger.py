@@ -0,0 +1,142 @@
+import json
+from collections import defaultdict
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# USD per million tokens: (input, output, cached input reads, cache writes), matched by model id prefix.
+# Clients record the model id they requested; the turbo snapshot ids are listed in case a usage
+# dict carries the id a provider resolved the request to instead.
+PRICING: Dict[str, Tuple[float, float, float, float]] = {
+    "claude-3-opus": (15.0, 75.0, 1.5, 18.75),
+    "claude-3-sonnet": (3.0, 15.0, 0.3, 3.75),
+    "claude-3-haiku": (0.25, 1.25, 0.03, 0.3),
+    "gpt-4-turbo": (10.0, 30.0, 10.0, 10.0),
+    "gpt-4-0125-preview": (10.0, 30.0, 10.0, 10.0),
+    "gpt-4-1106-preview": (10.0, 30.0, 10.0, 10.0),
+    "gpt-4": (30.0, 60.0, 30.0, 30.0),
+    "gemini-pro": (0.5, 1.5, 0.5, 0.5)
+}
+
+
+def model_pricing(model: str) -> Optional[Tuple[float, float, float, float]]:
+    # Longest prefix first so "gpt-4-turbo-preview" isn't priced as "gpt-4"
+    for prefix in sorted(PRICING, key=len, reverse=True):
+        if model.startswith(prefix):
+            return PRICING[prefix]
+    return None
+
+
+def estimate_cost(model: str, input_tokens: int, output_tokens: int, cached_input_tokens: int = 0,
+                  cache_write_input_tokens: int = 0) -> float:
+    """USD cost of one call; unpriced models (local endpoints) cost nothing"""
+    pricing = model_pricing(model)
+    if pricing is None:
+        return 0.0
+    input_price, output_price, cached_price, cache_write_price = pricing
+    return (input_tokens * input_price + output_tokens * output_price
+            + cached_input_tokens * cached_price + cache_write_input_tokens * cache_write_price) / 1e6
+
+
+@dataclass
+class LedgerEntry:
+    scenario: str
+    event_index: int
+    provider: str
+    model: str
+    input_tokens: int
+    output_tokens: int
+    cached_input_tokens: int
+    latency: float
+    cost: float
+    score: Optional[float] = None  # Mean metric score of the response, if it was evaluated
+    cache_write_input_tokens: int = 0  # Defaulted so ledgers saved before it was tracked still load
+
+
+class CostLedger:
+    """Token usage, latency and cost of every provider call in a run"""
+
+    def __init__(self, run_id: Optional[str] = None):
+        self.run_id = run_id or datetime.now().strftime("%Y%m%d-%H%M%S")
+        self.entries: List[LedgerEntry] = []
+
+    def record(self, scenario: str, event_index: int, provider: str, response: Any,
+               score: Optional[float] = None) -> LedgerEntry:
+        """Add a call; `response` is a ModelResponse (plain strings, e.g. cache hits, count as free)"""
+        usage = getattr(response, "usage", None) or {}
+        return self.record_usage(scenario, event_index, provider, usage, score)
+
+    def record_usage(self, scenario: str, event_index: int, provider: str, usage: Dict[str, Any],
+                     score: Optional[float] = None) -> LedgerEntry:
+        model = usage.get("model") or ""
+        input_tokens = usage.get("input_tokens", 0)
+        output_tokens = usage.get("output_tokens", 0)
+        cached_input_tokens = usage.get("cached_input_tokens", 0)
+        cache_write_input_tokens = usage.get("cache_write_input_tokens", 0)
+        entry = LedgerEntry(
+            scenario, event_index, provider, model, input_tokens, output_tokens, cached_input_tokens,
+            usage.get("latency", 0.0),
+            estimate_cost(model, input_tokens, output_tokens, cached_input_tokens, cache_write_input_tokens),
+            score, cache_write_input_tokens
+        )
+        self.entries.append(entry)
+        return entry
+
+    @classmethod
+    def from_results(cls, results: List[Dict], run_id: Optional[str] = None) -> "CostLedger":
+        """Rebuild a ledger from stored Worker results (see significance.load_results)"""
+        ledger = cls(run_id)
+        for result in results:
+            metrics = [v for v in (result.get("metrics") or {}).values() if v is not None]
+            score = float(np.nanmean(metrics)) if metrics else None
+            usage = result.get("usage") or {"latency": result.get("latency", 0.0)}
+            ledger.record_usage(result["scenario"], result["event_index"], result["model"], usage, score)
+        return ledger
+
+    def totals(self, by: Tuple[str, ...] = ("provider",)) -> Dict[Tuple, Dict[str, float]]:
+        """Aggregate usage grouped by entry fields, e.g. ("scenario",) or ("scenario", "provider")"""
+        groups: Dict[Tuple, List[LedgerEntry]] = defaultdict(list)
+        for entry in self.entries:
+            groups[tuple(getattr(entry, field) for field in by)].append(entry)
+
+        totals = {}
+        for key, entries in groups.items():
+            cost = sum(e.cost for e in entries)
+            latency = sum(e.latency for e in entries)
+            output_tokens = sum(e.output_tokens for e in entries)
+            scores = [e.score for e in entries if e.score is not None and not np.isnan(e.score)]
+            points = sum(scores)
+            totals[key] = {
+                "requests": len(entries),
+                "input_tokens": sum(e.input_tokens for e in entries),
+                "output_tokens": output_tokens,
+                "cached_input_tokens": sum(e.cached_input_tokens for e in entries),
+                "cache_write_input_tokens": sum(e.cache_write_input_tokens for e in entries),
+                "latency": latency,
+                "cost": cost,
+                # Generation throughput per call, not wall-clock: concurrent calls overlap
+                "tokens_per_second": output_tokens / latency if latency > 0 else 0.0,
+                "cost_per_request": cost / len(entries),
+                "metric_points": points,
+                "cost_per_metric_point": cost / points if points > 0 else float("nan")
+            }
+        return totals
+
+    def save(self, path: str):
+        with open(path, "w") as f:
+            json.dump({
+                "run_id": self.run_id,
+                "totals_by_provider": {k[0]: v for k, v in self.totals(("provider",)).items()},
+                "totals_by_scenario": {k[0]: v for k, v in self.totals(("scenario",)).items()},
+                "entries": [asdict(e) for e in self.entries]
+            }, f, indent=2)
+
+    @classmethod
+    def load(cls, path: str) -> "CostLedger":
+        with open(path) as f:
+            data = json.load(f)
+        ledger = cls(data["run_id"])
+        ledger.entries = [LedgerEntry(**entry) for entry in data["entries"]]
+        return ledger
@@ -0,0 +1,394 @@
+import asyncio
+import csv
+import json
+import multiprocessing
+import os
+import socket
+import sqlite3
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from utils.cost_ledger import CostLedger
+from utils.evaluator import EnhancedEvaluator, SimulationEvent
+from utils.live_feed import LiveFeed
+from utils.model_clients import MultiModelManager, configured_providers
+from utils.prompt_builder import PromptBuilder
+from utils.scheduler import GlobalScheduler, ScheduledJob, event_priority
+
+
+def load_csv_scenarios(path: str = "data.csv") -> Dict[str, List[SimulationEvent]]:
+    """Turn each data.csv row into a two-event scenario (initial input, dynamic update)"""
+    scenarios = {}
+    with open(path, newline="") as f:
+        for row in csv.DictReader(f, delimiter="\t"):
+            now = datetime.now().isoformat()
+            context = {"domain": row["Domain"], "audience": row["Audience"]}
+            scenarios[f"csv_{row['Scenario ID']}"] = [
+                SimulationEvent(now, "initial_report", row["Initial Input"].strip('"'),
+                                severity_level=4, required_action=True, context_update=context),
+                SimulationEvent(now, "update", row["Dynamic Update"].strip('"'),
+                                severity_level=5, required_action=True, context_update={})
+            ]
+    return scenarios
+
+
+def load_all_scenarios(csv_path: Optional[str] = "data.csv") -> Dict[str, List[SimulationEvent]]:
+    from scenarios.natural_disaster import get_earthquake_scenario
+    from scenarios.medical_triage import get_medical_scenario
+    from scenarios.infrastructure_crisis import get_infrastructure_scenario
+
+    scenarios = {
+        "Earthquake Response": get_earthquake_scenario(),
+        "Medical Triage": get_medical_scenario(),
+        "Infrastructure Crisis": get_infrastructure_scenario()
+    }
+    if csv_path and os.path.exists(csv_path):
+        scenarios.update(load_csv_scenarios(csv_path))
+    return scenarios
+
+
+@dataclass
+class WorkUnit:
+    unit_id: str
+    scenario: str
+    event_index: int
+    model: str
+    attempts: int = 0
+    priority: int = 0  # event_priority of the unit's event; higher is claimed first
+
+
+class WorkQueue:
+    """SQLite-backed work queue shared by the coordinator and its workers"""
+
+    def __init__(self, db_path: str, lease_seconds: float = 300.0):
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS work_units (
+                unit_id TEXT PRIMARY KEY,
+                scenario TEXT NOT NULL,
+                event_index INTEGER NOT NULL,
+                model TEXT NOT NULL,
+                priority INTEGER NOT NULL DEFAULT 0,
+                status TEXT NOT NULL DEFAULT 'pending',
+                worker TEXT,
+                claimed_at REAL,
+                attempts INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS idx_units_status ON work_units(status);
+            CREATE TABLE IF NOT EXISTS results (
+                unit_id TEXT PRIMARY KEY,
+                worker TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                completed_at REAL NOT NULL
+            );
+        """)
+        try:
+            # Queues created before units carried a priority
+            self.conn.execute("ALTER TABLE work_units ADD COLUMN priority INTEGER NOT NULL DEFAULT 0")
+        except sqlite3.OperationalError:
+            pass
+
+    def enqueue(self, units: List[WorkUnit]) -> int:
+        # Re-enqueueing an existing unit is a no-op, so coordinators can be restarted safely
+        before = self.conn.total_changes
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO work_units (unit_id, scenario, event_index, model, priority) VALUES (?, ?, ?, ?, ?)",
+            [(u.unit_id, u.scenario, u.event_index, u.model, u.priority) for u in units]
+        )
+        return self.conn.total_changes - before
+
+    def claim(self, worker: str) -> Optional[WorkUnit]:
+        now = time.time()
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = self.conn.execute(
+                """SELECT unit_id, scenario, event_index, model, attempts, priority FROM work_units
+                   WHERE status = 'pending' OR (status = 'running' AND claimed_at < ?)
+                   ORDER BY attempts, priority DESC, unit_id LIMIT 1""",
+                (now - self.lease_seconds,)
+            ).fetchone()
+            if row is None:
+                self.conn.execute("COMMIT")
+                return None
+            self.conn.execute(
+                "UPDATE work_units SET status = 'running', worker = ?, claimed_at = ?, attempts = attempts + 1 WHERE unit_id = ?",
+                (worker, now, row[0])
+            )
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        return WorkUnit(row[0], row[1], row[2], row[3], row[4] + 1, row[5])
+
+    def complete(self, unit: WorkUnit, worker: str, payload: Dict) -> None:
+        # First result wins; a duplicate from a worker whose lease expired is dropped
+        self.conn.execute("BEGIN IMMEDIATE")
+        self.conn.execute(
+            "INSERT OR IGNORE INTO results (unit_id, worker, payload, completed_at) VALUES (?, ?, ?, ?)",
+            (unit.unit_id, worker, json.dumps(payload, default=str), time.time())
+        )
+        self.conn.execute("UPDATE work_units SET status = 'done' WHERE unit_id = ?", (unit.unit_id,))
+        self.conn.execute("COMMIT")
+
+    def release(self, unit: WorkUnit, max_attempts: int) -> None:
+        status = "failed" if unit.attempts >= max_attempts else "pending"
+        self.conn.execute("UPDATE work_units SET status = ? WHERE unit_id = ?", (status, unit.unit_id))
+
+    def counts(self) -> Dict[str, int]:
+        return dict(self.conn.execute("SELECT status, COUNT(*) FROM work_units GROUP BY status").fetchall())
+
+    def results(self) -> List[Dict]:
+        rows = self.conn.execute(
+            """SELECT w.scenario, w.event_index, w.model, r.worker, r.payload
+               FROM results r JOIN work_units w ON w.unit_id = r.unit_id
+               ORDER BY w.scenario, w.event_index, w.model"""
+        ).fetchall()
+        return [
+            {"scenario": s, "event_index": i, "model": m, "worker": wk, **json.loads(p)}
+            for s, i, m, wk, p in rows
+        ]
+
+    def close(self):
+        self.conn.close()
+
+
+class Coordinator:
+    """Shards (scenario, event, model) work units onto the queue and merges results"""
+
+    def __init__(self, db_path: str, models: Optional[List[str]] = None):
+        self.queue = WorkQueue(db_path)
+        self.models = models or configured_providers()
+
+    def shard(self, scenarios: Dict[str, List[SimulationEvent]]) -> int:
+        units = [
+            WorkUnit(f"{name}:{index}:{model}", name, index, model, priority=event_priority(event))
+            for name, events in scenarios.items()
+            for index, event in enumerate(events)
+            for model in self.models
+        ]
+        return self.queue.enqueue(units)
+
+    def merge_results(self, output_path: Optional[str] = None) -> Dict[str, Dict[str, List[Dict]]]:
+        merged: Dict[str, Dict[str, List[Dict]]] = {}
+        for result in self.queue.results():
+            merged.setdefault(result["scenario"], {}).setdefault(result["model"], []).append(result)
+        if output_path:
+            with open(output_path, "w") as f:
+                json.dump(merged, f, indent=2, default=str)
+        return merged
+
+    def write_ledger(self, path: str) -> CostLedger:
+        """Persist the run's token and cost ledger next to the merged results"""
+        ledger = CostLedger.from_results(self.queue.results())
+        ledger.save(path)
+        return ledger
+
+
+class Worker:
+    """Pulls work units off the queue, queries the model and scores the response"""
+
+    def __init__(self, db_path: str, scenarios: Dict[str, List[SimulationEvent]],
+                 worker_id: Optional[str] = None, max_attempts: int = 3,
+                 live_feed: Optional[str] = None):
+        self.queue = WorkQueue(db_path)
+        self.run_id = os.path.splitext(os.path.basename(db_path))[0]
+        # Per-event results are also pushed here for the dashboard to tail while the run is in progress
+        live_feed = live_feed or os.getenv("STRESSTEST_LIVE_FEED")
+        self.feed = LiveFeed(live_feed) if live_feed else None
+        self.scenarios = scenarios
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.max_attempts = max_attempts
+        self.manager = MultiModelManager()
+        self.evaluators: Dict[str, EnhancedEvaluator] = {}
+        self.prompt_builders: Dict[tuple, PromptBuilder] = {}
+
+    def _evaluator(self, scenario: str) -> EnhancedEvaluator:
+        if scenario not in self.evaluators:
+            # Scoring never calls a provider, so don't construct one (or import its SDK) for it
+            self.evaluators[scenario] = EnhancedEvaluator(scenario, client=None)
+        return self.evaluators[scenario]
+
+    def _prompt_builder(self, scenario: str, model: str) -> PromptBuilder:
+        key = (scenario, model)
+        if key not in self.prompt_builders:
+            self.prompt_builders[key] = PromptBuilder(scenario, model)
+        return self.prompt_builders[key]
+
+    async def process(self, unit: WorkUnit) -> Dict:
+        events = self.scenarios[unit.scenario]
+        event = events[unit.event_index]
+        builder = self._prompt_builder(unit.scenario, unit.model)
+        packed = builder.build(events, unit.event_index)
+
+        start = time.perf_counter()
+        response = await self.manager.clients[unit.model].generate_packed(packed)
+        latency = time.perf_counter() - start
+        builder.record_usage(response)
+
+        # Score against the facts the model was actually given, not ones the budget dropped
+        metrics = self._evaluator(unit.scenario).evaluate_response({unit.model: response}, packed.context)
+        return {
+            "event_type": event.event_type,
+            "response": response,
+            "latency": latency,
+            "prompt_tokens": packed.tokens,
+            "tokens_saved": packed.baseline_tokens - packed.tokens,
+            # Provider-reported usage (ModelResponse); absent for cache hits
+            "usage": getattr(response, "usage", None),
+            "metrics": metrics.__dict__
+        }
+
+    async def run(self) -> int:
+        processed = 0
+        while True:
+            unit = self.queue.claim(self.worker_id)
+            if unit is None:
+                return processed
+            start = time.perf_counter()
+            try:
+                payload = await self.process(unit)
+            except Exception as e:
+                self._fail(unit, time.perf_counter() - start, e)
+                continue
+            self._complete(unit, payload)
+            processed += 1
+
+    def close(self):
+        self.manager.close()
+        if self.feed:
+            self.feed.close()
+        self.queue.close()
+
+    def _complete(self, unit: WorkUnit, payload: Dict):
+        self.queue.complete(unit, self.worker_id, payload)
+        if self.feed:
+            self.feed.publish_result(self.run_id, unit.scenario, unit.event_index, unit.model,
+                                     payload["latency"], {"metrics": payload["metrics"], "usage": payload["usage"]})
+
+    def _fail(self, unit: WorkUnit, elapsed: float, error: Exception):
+        print(f"Worker {self.worker_id} failed on {unit.unit_id}: {error}")
+        self.queue.release(unit, self.max_attempts)
+        # Every failed attempt is published, including ones the queue will retry
+        if self.feed:
+            self.feed.publish_failure(self.run_id, unit.scenario, unit.event_index, unit.model,
+                                      elapsed, str(error))
+
+    async def _process_scheduled(self, job: ScheduledJob):
+        unit = job.payload
+        start = time.perf_counter()
+        try:
+            payload = await self.process(unit)
+        except Exception as e:
+            self._fail(unit, time.perf_counter() - start, e)
+            raise
+        self._complete(unit, payload)
+
+    async def run_scheduled(self, max_in_flight: int = 16, max_queue_depth: int = 32,
+                            provider_limits: Optional[Dict[str, int]] = None) -> Dict:
+        """Process units concurrently through a GlobalScheduler.
+
+        Units are claimed only while the local queue has room, so a busy worker
+        doesn't hold leases on work it can't start yet.
+        """
+        scheduler = GlobalScheduler(self._process_scheduled, max_in_flight=max_in_flight,
+                                    provider_limits=provider_limits, max_queue_depth=max_queue_depth)
+        while True:
+            unit = self.queue.claim(self.worker_id)
+            if unit is None:
+                break
+            await scheduler.submit(unit.model, unit.priority, unit)
+        await scheduler.close()
+        return scheduler.stats()
+
+
+def _worker_main(db_path: str, csv_path: Optional[str], worker_id: str,
+                 scenario_loader: Callable[[Optional[str]], Dict[str, List[SimulationEvent]]]):
+    worker = Worker(db_path, scenario_loader(csv_path), worker_id=worker_id)
+    try:
+        asyncio.run(worker.run())
+    finally:
+        # multiprocessing children exit via os._exit, so atexit handlers never run here
+        worker.close()
+
+
+def run_local_workers(db_path: str, num_workers: int, csv_path: Optional[str] = "data.csv",
+                      scenario_loader=load_all_scenarios) -> Dict[str, float]:
+    """Drain the queue with num_workers local processes and report throughput"""
+    done_before = WorkQueue(db_path).counts().get("done", 0)
+    start = time.perf_counter()
+    processes = [
+        multiprocessing.Process(target=_worker_main,
+                                args=(db_path, csv_path, f"local-{i}", scenario_loader))
+        for i in range(num_workers)
+    ]
+    for p in processes:
+        p.start()
+    for p in processes:
+        p.join()
+    elapsed = time.perf_counter() - start
+    completed = WorkQueue(db_path).counts().get("done", 0) - done_before
+    return {
+        "workers": num_workers,
+        "units": completed,
+        "seconds": elapsed,
+        "units_per_second": completed / elapsed if elapsed > 0 else 0.0
+    }
+
+
+def measure_scaling(worker_counts: List[int], csv_path: Optional[str] = "data.csv",
+                    scenario_loader=load_all_scenarios, workdir: str = ".") -> List[Dict[str, float]]:
+    """Run the full sweep once per worker count on a fresh queue"""
+    report = []
+    for count in worker_counts:
+        db_path = os.path.join(workdir, f"scaling_{count}.db")
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(db_path + suffix):
+                os.remove(db_path + suffix)
+        Coordinator(db_path).shard(scenario_loader(csv_path))
+        stats = run_local_workers(db_path, count, csv_path, scenario_loader)
+        print(f"{count} workers: {stats['units']} units in {stats['seconds']:.1f}s "
+              f"({stats['units_per_second']:.2f} units/s)")
+        report.append(stats)
+    return report
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Distributed scenario evaluation")
+    parser.add_argument("role", choices=["coordinator", "worker", "local", "scaling"])
+    parser.add_argument("--db", default="stress_queue.db")
+    parser.add_argument("--csv", default="data.csv")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--output", default="distributed_results.json")
+    parser.add_argument("--ledger", default="distributed_ledger.json")
+    parser.add_argument("--in-flight", type=int, default=1,
+                        help="Concurrent provider calls per worker (priority-scheduled when > 1)")
+    args = parser.parse_args()
+
+    if args.role == "coordinator":
+        coordinator = Coordinator(args.db)
+        print(f"Enqueued {coordinator.shard(load_all_scenarios(args.csv))} new work units")
+        print(coordinator.queue.counts())
+    elif args.role == "worker":
+        worker = Worker(args.db, load_all_scenarios(args.csv))
+        try:
+            if args.in_flight > 1:
+                print(asyncio.run(worker.run_scheduled(max_in_flight=args.in_flight)))
+            else:
+                print(f"Processed {asyncio.run(worker.run())} work units")
+        finally:
+            worker.close()
+    elif args.role == "local":
+        coordinator = Coordinator(args.db)
+        coordinator.shard(load_all_scenarios(args.csv))
+        print(run_local_workers(args.db, args.workers, args.csv))
+        coordinator.merge_results(args.output)
+        coordinator.write_ledger(args.ledger)
+    else:
+        measure_scaling([1, 2, args.workers], args.csv)
@@ -0,0 +1,86 @@
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+from utils.model_clients import OpenAICompatibleClient
+
+
+class FakeProviderServer:
+    """Local OpenAI-compatible chat completions endpoint with a fixed capacity.
+
+    At most `capacity` requests are served at once, each taking roughly
+    `service_time` seconds, so latency rises sharply once the offered load
+    exceeds capacity / service_time requests per second. A fraction
+    `error_rate` of requests fail with HTTP 500.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, capacity: int = 4,
+                 service_time: float = 0.05, jitter: float = 0.2, error_rate: float = 0.0):
+        self.slots = threading.Semaphore(capacity)
+        self.service_time = service_time
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.httpd = ThreadingHTTPServer((host, port), self._handler())
+        self.httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                with server.slots:
+                    time.sleep(server.service_time * random.uniform(1 - server.jitter, 1 + server.jitter))
+                if random.random() < server.error_rate:
+                    self.send_response(500)
+                    self.end_headers()
+                    return
+                prompt = body.get("messages", [{}])[-1].get("content", "")
+                payload = json.dumps({
+                    "model": body.get("model", "fake"),
+                    "choices": [{"message": {"role": "assistant", "content":
+                        "ASSESSMENT: Situation noted.\nDECISION: Prioritize life safety.\n"
+                        "REASONING: Because resources are limited.\nCONSEQUENCES: Monitor."}}],
+                    "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": 20}
+                }).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> "FakeProviderServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class FakeProviderClient(OpenAICompatibleClient):
+    """Client for FakeProviderServer"""
+
+    def __init__(self, base_url: str, model: str = "fake"):
+        super().__init__(base_url, model)
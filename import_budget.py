@@ -0,0 +1,45 @@
+import re
+import subprocess
+import sys
+from typing import Dict
+
+# Cumulative import time allowed per module, in seconds. None of these should pull in
+# a provider SDK or transformers/torch until a client or scorer is actually used.
+IMPORT_BUDGETS = {
+    "utils.model_clients": 0.2,
+    "utils.evaluator": 0.5,
+    "utils.prompt_builder": 0.1,
+    "utils.profiling": 0.1
+}
+
+HEAVY_MODULES = ("anthropic", "openai", "google.generativeai", "transformers", "torch", "scipy")
+
+
+def measure_import(module: str) -> Dict[str, object]:
+    """Import `module` in a fresh interpreter and report its cumulative import time"""
+    probe = f"import sys, {module}; print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", probe],
+                            capture_output=True, text=True, check=True)
+    cumulative_us = 0
+    for line in result.stderr.splitlines():
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \|\s*(\S+)$", line)
+        if match and match.group(2) == module:
+            cumulative_us = int(match.group(1))
+    heavy = [m for m in result.stdout.strip().split(",") if m]
+    return {"seconds": cumulative_us / 1e6, "heavy_modules": heavy}
+
+
+def check_budgets(budgets: Dict[str, float] = IMPORT_BUDGETS) -> bool:
+    ok = True
+    for module, budget in budgets.items():
+        measured = measure_import(module)
+        within = measured["seconds"] <= budget and not measured["heavy_modules"]
+        ok = ok and within
+        status = "ok" if within else "OVER"
+        print(f"{status:4} {module}: {measured['seconds'] * 1000:.1f}ms (budget {budget * 1000:.0f}ms)"
+              + (f", eagerly imports {', '.join(measured['heavy_modules'])}" if measured["heavy_modules"] else ""))
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if check_budgets() else 1)
@@ -0,0 +1,132 @@
+import json
+import math
+import sqlite3
+import time
+from collections import defaultdict, deque
+from typing import Any, Deque, Dict, List, Optional
+
+import numpy as np
+
+
+class LiveFeed:
+    """Append-only SQLite (WAL) table that runs publish to and dashboards tail.
+
+    Readers ask for rows after the last id they saw, so each refresh costs
+    the number of new rows rather than the size of the run. Latency samples
+    are buffered and written every `flush_interval` seconds; results and
+    failures are written immediately.
+    """
+
+    def __init__(self, db_path: str = "live_feed.db", flush_interval: float = 0.5):
+        self.db_path = db_path
+        self.flush_interval = flush_interval
+        self.conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS feed (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                run_id TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                model TEXT,
+                scenario TEXT,
+                event_index INTEGER,
+                latency REAL,
+                outcome TEXT,
+                payload TEXT,
+                created_at REAL NOT NULL
+            )
+        """)
+        self.conn.commit()
+        self._pending: List[tuple] = []
+        self._last_flush = time.monotonic()
+
+    def publish_result(self, run_id: str, scenario: str, event_index: int, model: str,
+                       latency: float, payload: Dict[str, Any]):
+        self._pending.append((run_id, "result", model, scenario, event_index, latency, "ok",
+                              json.dumps(payload, default=str), time.time()))
+        self.flush()
+
+    def publish_failure(self, run_id: str, scenario: str, event_index: int, model: str,
+                        latency: float, error: str):
+        self._pending.append((run_id, "result", model, scenario, event_index, latency, "error",
+                              json.dumps({"error": error}), time.time()))
+        self.flush()
+
+    def publish_latency(self, run_id: str, model: str, latency: float, outcome: str = "ok"):
+        self._pending.append((run_id, "latency", model, None, None, latency, outcome, None, time.time()))
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        if self._pending:
+            self.conn.executemany(
+                """INSERT INTO feed (run_id, kind, model, scenario, event_index, latency, outcome, payload, created_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                self._pending
+            )
+            self.conn.commit()
+            self._pending = []
+        self._last_flush = time.monotonic()
+
+    def read_since(self, offset: int, limit: int = 5000) -> List[Dict[str, Any]]:
+        """Rows with id > offset, oldest first; at most `limit` so one refresh stays bounded"""
+        cursor = self.conn.execute(
+            """SELECT id, run_id, kind, model, scenario, event_index, latency, outcome, payload, created_at
+               FROM feed WHERE id > ? ORDER BY id LIMIT ?""",
+            (offset, limit)
+        )
+        columns = [c[0] for c in cursor.description]
+        rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+        for row in rows:
+            row["payload"] = json.loads(row["payload"]) if row["payload"] else None
+        return rows
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+
+
+class LiveAggregate:
+    """Running per-model totals over feed rows; memory is bounded by the sample windows"""
+
+    def __init__(self, latency_window: int = 1000, recent: int = 20):
+        self.offset = 0
+        self.rows = 0
+        self.results: Dict[str, int] = defaultdict(int)
+        self.failures: Dict[str, int] = defaultdict(int)
+        self.metric_sums: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        self.metric_counts: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self.latencies: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=latency_window))
+        self.recent: Deque[Dict[str, Any]] = deque(maxlen=recent)
+
+    def update(self, rows: List[Dict[str, Any]]):
+        for row in rows:
+            self.offset = row["id"]
+            self.rows += 1
+            model = row["model"]
+            if row["outcome"] != "ok":
+                self.failures[model] += 1
+                continue
+            self.latencies[model].append(row["latency"])
+            if row["kind"] == "result":
+                self.results[model] += 1
+                for metric, value in (row["payload"] or {}).get("metrics", {}).items():
+                    if value is not None and not math.isnan(value):
+                        self.metric_sums[model][metric] += value
+                        self.metric_counts[model][metric] += 1
+                self.recent.appendleft(row)
+
+    def model_summary(self) -> Dict[str, Dict[str, float]]:
+        summary = {}
+        for model in sorted(set(self.latencies) | set(self.failures)):
+            latencies = np.array(self.latencies[model])
+            p50, p95 = np.percentile(latencies, [50, 95]) if len(latencies) else (np.nan, np.nan)
+            summary[model] = {
+                "results": self.results[model],
+                "failures": self.failures[model],
+                "latency_p50": float(p50),
+                "latency_p95": float(p95),
+                **{metric: total / self.metric_counts[model][metric]
+                   for metric, total in self.metric_sums[model].items()}
+            }
+        return summary
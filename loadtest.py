@@ -0,0 +1,169 @@
+import asyncio
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from utils.evaluator import SimulationEvent, accumulate_context, build_event_prompt
+from utils.live_feed import LiveFeed
+from utils.model_clients import ModelClient
+
+
+def arrival_times(pattern: str, rate: float, duration: float, burst_size: int = 10,
+                  seed: Optional[int] = None) -> List[float]:
+    """Request start offsets (seconds) for a stage of `duration` at `rate` requests/s"""
+    rng = random.Random(seed)
+    if pattern == "constant":
+        return [i / rate for i in range(int(rate * duration))]
+    if pattern == "poisson":
+        times, t = [], rng.expovariate(rate)
+        while t < duration:
+            times.append(t)
+            t += rng.expovariate(rate)
+        return times
+    if pattern == "burst":
+        # Same average rate, delivered as back-to-back bursts of burst_size requests
+        interval = burst_size / rate
+        return [b * interval for b in range(int(duration / interval)) for _ in range(burst_size)]
+    raise ValueError(f"Unknown arrival pattern: {pattern}")
+
+
+@dataclass
+class RequestSample:
+    provider: str
+    scheduled: float
+    latency: float
+    outcome: str  # "ok", "error" or "timeout"
+
+
+def summarize_stage(samples: List[RequestSample], offered_rate: float, duration: float) -> Dict[str, float]:
+    latencies = np.array([s.latency for s in samples if s.outcome == "ok"])
+    total = max(len(samples), 1)
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) if len(latencies) else (np.nan,) * 3
+    return {
+        "offered_rate": offered_rate,
+        "requests": len(samples),
+        "throughput": len(latencies) / duration,
+        "p50": float(p50),
+        "p95": float(p95),
+        "p99": float(p99),
+        "error_rate": sum(s.outcome == "error" for s in samples) / total,
+        "timeout_rate": sum(s.outcome == "timeout" for s in samples) / total
+    }
+
+
+def find_knee(stages: List[Dict[str, float]], latency_factor: float = 2.0,
+              max_failure_rate: float = 0.05) -> Optional[float]:
+    """First offered rate where p95 blows past the unloaded p95, failures climb, or throughput stalls"""
+    if not stages:
+        return None
+    baseline_p95 = stages[0]["p95"]
+    for stage in stages:
+        failures = stage["error_rate"] + stage["timeout_rate"]
+        if (stage["p95"] > baseline_p95 * latency_factor or failures > max_failure_rate
+                or stage["throughput"] < 0.9 * stage["offered_rate"]):
+            return stage["offered_rate"]
+    return None
+
+
+class LoadGenerator:
+    """Open-loop load: requests fire on schedule whether or not earlier ones have finished"""
+
+    def __init__(self, clients: Dict[str, ModelClient], scenario_name: str,
+                 events: List[SimulationEvent], timeout: float = 30.0, max_in_flight: int = 1000,
+                 feed: Optional[LiveFeed] = None, run_id: str = "loadtest"):
+        self.clients = clients
+        self.timeout = timeout
+        self.max_in_flight = max_in_flight
+        self.feed = feed
+        self.run_id = run_id
+        self.prompts = [
+            build_event_prompt(scenario_name, event, accumulate_context(events, i))
+            for i, event in enumerate(events)
+        ]
+
+    async def _fire(self, provider: str, client: ModelClient, prompt: str,
+                    scheduled: float, samples: List[RequestSample]):
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(client.generate_response(prompt), self.timeout)
+            outcome = "ok"
+        except asyncio.TimeoutError:
+            outcome = "timeout"
+        except Exception:
+            outcome = "error"
+        latency = time.perf_counter() - start
+        samples.append(RequestSample(provider, scheduled, latency, outcome))
+        if self.feed:
+            self.feed.publish_latency(self.run_id, provider, latency, outcome)
+
+    async def run_stage(self, provider: str, pattern: str, rate: float,
+                        duration: float, seed: Optional[int] = None) -> Dict[str, float]:
+        client = self.clients[provider]
+        samples: List[RequestSample] = []
+        tasks = []
+        origin = time.perf_counter()
+        for i, offset in enumerate(arrival_times(pattern, rate, duration, seed=seed)):
+            delay = origin + offset - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            prompt = self.prompts[i % len(self.prompts)]
+            tasks.append(asyncio.create_task(self._fire(provider, client, prompt, offset, samples)))
+        await asyncio.gather(*tasks)
+        if self.feed:
+            self.feed.flush()
+        return summarize_stage(samples, rate, duration)
+
+    async def ramp(self, rates: List[float], pattern: str = "poisson", stage_duration: float = 10.0,
+                   seed: Optional[int] = None) -> Dict[str, Dict]:
+        # Thread-backed clients would otherwise be capped by the default executor size
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(self.max_in_flight))
+        report = {}
+        for provider in self.clients:
+            stages = []
+            for rate in rates:
+                stage = await self.run_stage(provider, pattern, rate, stage_duration, seed)
+                print(f"{provider} @ {rate:.1f} req/s: p50={stage['p50']:.3f}s p95={stage['p95']:.3f}s "
+                      f"p99={stage['p99']:.3f}s errors={stage['error_rate']:.1%} "
+                      f"timeouts={stage['timeout_rate']:.1%}")
+                stages.append(stage)
+            report[provider] = {"stages": stages, "knee_rate": find_knee(stages)}
+        return report
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+    from scenarios.natural_disaster import get_earthquake_scenario
+    from utils.fake_provider import FakeProviderClient, FakeProviderServer
+
+    parser = argparse.ArgumentParser(description="Latency-under-load stress mode")
+    parser.add_argument("--pattern", choices=["constant", "poisson", "burst"], default="poisson")
+    parser.add_argument("--rates", default="10,20,40,60,80,120")
+    parser.add_argument("--stage-seconds", type=float, default=5.0)
+    parser.add_argument("--live", action="store_true", help="Target the real providers instead of the fake server")
+    parser.add_argument("--live-feed", help="SQLite feed to stream latency samples to for the dashboard")
+    args = parser.parse_args()
+    rates = [float(r) for r in args.rates.split(",")]
+    feed = LiveFeed(args.live_feed) if args.live_feed else None
+
+    async def main():
+        if args.live:
+            from utils.model_clients import MultiModelManager
+            clients = MultiModelManager().clients
+            generator = LoadGenerator(clients, "Earthquake Response", get_earthquake_scenario(), feed=feed)
+            return await generator.ramp(rates, args.pattern, args.stage_seconds)
+        with FakeProviderServer(capacity=4, service_time=0.05) as server:
+            clients = {"fake": FakeProviderClient(server.url)}
+            generator = LoadGenerator(clients, "Earthquake Response", get_earthquake_scenario(), timeout=5.0,
+                                      feed=feed)
+            return await generator.ramp(rates, args.pattern, args.stage_seconds)
+
+    report = asyncio.run(main())
+    for provider, result in report.items():
+        print(f"{provider}: saturation knee at {result['knee_rate']} req/s")
+    with open("load_results.json", "w") as f:
+        json.dump(report, f, indent=2)
@@ -1,66 +1,350 @@
-from typing import Dict, Any
-import anthropic
-import google.generativeai as genai
-from openai import OpenAI
+from typing import Dict, Any, List, Iterator, Mapping, Optional, Callable
+import asyncio
+import json
 import os
-from dotenv import load_dotenv
+import time
+from utils.profiling import profiler
+from utils.registry import Registry
+
+# SDKs are imported inside each client so importing this module stays cheap
+PROVIDERS = Registry("provider", "stresstest.providers")
+
+DEFAULT_PROVIDERS = ["claude", "gpt4", "gemini"]
+
+class ModelResponse(str):
+    """Response text plus the usage metadata the provider reported.
+
+    A str subclass so callers that treat responses as text keep working;
+    the cost ledger reads the extra attributes.
+    """
+    def __new__(cls, text: str, model: str = "", input_tokens: int = 0, output_tokens: int = 0,
+                latency: float = 0.0, cached_input_tokens: int = 0, cache_write_input_tokens: int = 0):
+        response = super().__new__(cls, text or "")
+        response.model = model  # The model id that was requested, which is what PRICING is keyed on
+        response.input_tokens = input_tokens or 0
+        response.output_tokens = output_tokens or 0
+        response.cached_input_tokens = cached_input_tokens or 0
+        response.cache_write_input_tokens = cache_write_input_tokens or 0
+        response.latency = latency
+        return response
+
+    @property
+    def text(self) -> str:
+        return str(self)
+
+    @property
+    def usage(self) -> Dict[str, Any]:
+        return {
+            "model": self.model,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "cached_input_tokens": self.cached_input_tokens,
+            "cache_write_input_tokens": self.cache_write_input_tokens,
+            "latency": self.latency
+        }
 
 class ModelClient:
     """Base class for model clients"""
     async def generate_response(self, prompt: str) -> str:
         raise NotImplementedError
 
+    async def generate_packed(self, packed) -> str:
+        """Send a PackedPrompt; providers with explicit prompt caching override this"""
+        return await self.generate_response(packed.text)
+
+    async def generate_chat(self, messages: List[Dict[str, str]]) -> str:
+        """Continue a conversation of alternating user/assistant messages"""
+        transcript = "\n\n".join(f"{m['role'].upper()}: {m['content']}" for m in messages)
+        return await self.generate_response(transcript + "\n\nASSISTANT:")
+
 class AnthropicClient(ModelClient):
+    MODEL = "claude-3-opus-20240229"
+
     def __init__(self, api_key: str):
-        self.client = anthropic.Client(api_key)
+        import anthropic
+        self.client = anthropic.AsyncAnthropic(api_key=api_key)
+
+    @staticmethod
+    def _normalize(response, latency: float, model: str = MODEL) -> ModelResponse:
+        # content is a list of blocks; only text blocks are part of the answer
+        usage = response.usage
+        return ModelResponse(
+            "".join(block.text for block in response.content if block.type == "text"),
+            model=model,
+            input_tokens=usage.input_tokens,
+            output_tokens=usage.output_tokens,
+            cached_input_tokens=getattr(usage, "cache_read_input_tokens", 0),
+            cache_write_input_tokens=getattr(usage, "cache_creation_input_tokens", 0),
+            latency=latency
+        )
         
+    @profiler.timed("provider.anthropic.generate_response")
     async def generate_response(self, prompt: str) -> str:
+        start = time.perf_counter()
         response = await self.client.messages.create(
-            model="claude-3-opus-20240229",
+            model=self.MODEL,
             max_tokens=1024,
             temperature=0.7,
             messages=[{"role": "user", "content": prompt}]
         )
-        return response.content
+        return self._normalize(response, time.perf_counter() - start)
+
+    @profiler.timed("provider.anthropic.generate_packed")
+    async def generate_packed(self, packed) -> str:
+        # One block per log line: a cache breakpoint at the end of the prefix also finds the
+        # shorter prefix the previous event cached at an earlier block boundary. Prefixes below
+        # the provider minimum are never cached, so don't ask
+        blocks = [{"type": "text", "text": segment} for segment in packed.segments or [packed.prefix]]
+        if packed.cacheable:
+            blocks[-1]["cache_control"] = {"type": "ephemeral"}
+        start = time.perf_counter()
+        response = await self.client.messages.create(
+            model=self.MODEL,
+            max_tokens=1024,
+            temperature=0.7,
+            messages=[{"role": "user", "content": blocks + [{"type": "text", "text": packed.body}]}]
+        )
+        return self._normalize(response, time.perf_counter() - start)
+
+    @profiler.timed("provider.anthropic.generate_chat")
+    async def generate_chat(self, messages: List[Dict[str, str]]) -> str:
+        start = time.perf_counter()
+        response = await self.client.messages.create(
+            model=self.MODEL,
+            max_tokens=1024,
+            temperature=0.7,
+            messages=messages
+        )
+        return self._normalize(response, time.perf_counter() - start)
 
 class OpenAIClient(ModelClient):
+    # Responses name the resolved snapshot (e.g. gpt-4-0125-preview); usage is priced by this id instead
+    MODEL = "gpt-4-turbo-preview"
+
     def __init__(self, api_key: str):
-        self.client = OpenAI(api_key=api_key)
+        from openai import AsyncOpenAI
+        self.client = AsyncOpenAI(api_key=api_key)
+
+    @staticmethod
+    def _normalize(response, latency: float, model: str = MODEL) -> ModelResponse:
+        # prompt_tokens includes automatically cached prefix tokens; split them out like Anthropic does
+        usage = response.usage
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached = getattr(details, "cached_tokens", 0) or 0
+        return ModelResponse(
+            response.choices[0].message.content,
+            model=model,
+            input_tokens=usage.prompt_tokens - cached,
+            output_tokens=usage.completion_tokens,
+            cached_input_tokens=cached,
+            latency=latency
+        )
         
+    @profiler.timed("provider.openai.generate_response")
     async def generate_response(self, prompt: str) -> str:
+        start = time.perf_counter()
         response = await self.client.chat.completions.create(
-            model="gpt-4-turbo-preview",
+            model=self.MODEL,
             messages=[{"role": "user", "content": prompt}],
             max_tokens=1024,
             temperature=0.7
         )
-        return response.choices[0].message.content
+        return self._normalize(response, time.perf_counter() - start)
+
+    @profiler.timed("provider.openai.generate_chat")
+    async def generate_chat(self, messages: List[Dict[str, str]]) -> str:
+        start = time.perf_counter()
+        response = await self.client.chat.completions.create(
+            model=self.MODEL,
+            messages=messages,
+            max_tokens=1024,
+            temperature=0.7
+        )
+        return self._normalize(response, time.perf_counter() - start)
 
 class GeminiClient(ModelClient):
+    MODEL = "gemini-pro"
+
     def __init__(self, api_key: str):
+        import google.generativeai as genai
         genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-pro')
+        self.model = genai.GenerativeModel(self.MODEL)
+
+    @staticmethod
+    def _normalize(response, latency: float, model: str = MODEL) -> ModelResponse:
+        usage = response.usage_metadata
+        return ModelResponse(
+            response.text,
+            model=model,
+            input_tokens=usage.prompt_token_count,
+            output_tokens=usage.candidates_token_count,
+            latency=latency
+        )
         
+    @profiler.timed("provider.gemini.generate_response")
+    async def generate_response(self, prompt: str) -> str:
+        start = time.perf_counter()
+        response = await self.model.generate_content_async(prompt)
+        return self._normalize(response, time.perf_counter() - start)
+
+    @profiler.timed("provider.gemini.generate_chat")
+    async def generate_chat(self, messages: List[Dict[str, str]]) -> str:
+        contents = [
+            {"role": "model" if m["role"] == "assistant" else "user", "parts": [m["content"]]}
+            for m in messages
+        ]
+        start = time.perf_counter()
+        response = await self.model.generate_content_async(contents)
+        return self._normalize(response, time.perf_counter() - start)
+
+class OpenAICompatibleClient(ModelClient):
+    """Any OpenAI-compatible /v1/chat/completions endpoint (llama.cpp server, vLLM, ...)"""
+    def __init__(self, base_url: str, model: str, api_key: Optional[str] = None):
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.api_key = api_key
+
+    def _post(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        import urllib.request
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        request = urllib.request.Request(
+            f"{self.base_url}/v1/chat/completions",
+            data=json.dumps(payload).encode(),
+            headers=headers
+        )
+        with urllib.request.urlopen(request, timeout=120) as response:
+            return json.loads(response.read())
+
+    @profiler.timed("provider.local.generate_chat")
+    async def generate_chat(self, messages: List[Dict[str, str]]) -> str:
+        start = time.perf_counter()
+        data = await asyncio.to_thread(self._post, {
+            "model": self.model,
+            "messages": messages,
+            "max_tokens": 1024,
+            "temperature": 0.7
+        })
+        usage = data.get("usage") or {}
+        return ModelResponse(
+            data["choices"][0]["message"]["content"],
+            model=data.get("model", self.model),
+            input_tokens=usage.get("prompt_tokens", 0),
+            output_tokens=usage.get("completion_tokens", 0),
+            latency=time.perf_counter() - start
+        )
+
     async def generate_response(self, prompt: str) -> str:
-        response = await self.model.generate_content(prompt)
-        return response.text
+        return await self.generate_chat([{"role": "user", "content": prompt}])
+
+@PROVIDERS.register("claude")
+def _claude_client() -> ModelClient:
+    return AnthropicClient(os.getenv('ANTHROPIC_API_KEY'))
+
+@PROVIDERS.register("gpt4")
+def _gpt4_client() -> ModelClient:
+    return OpenAIClient(os.getenv('OPENAI_API_KEY'))
+
+@PROVIDERS.register("gemini")
+def _gemini_client() -> ModelClient:
+    return GeminiClient(os.getenv('GOOGLE_API_KEY'))
+
+@PROVIDERS.register("llama")
+def _llama_client() -> ModelClient:
+    return OpenAICompatibleClient(
+        os.getenv('LLAMA_BASE_URL', 'http://localhost:8080'),
+        os.getenv('LLAMA_MODEL', 'llama'),
+        os.getenv('LLAMA_API_KEY')
+    )
+
+class LazyClients(Mapping):
+    """Provider name -> client, constructing each client on first access"""
+    def __init__(self, names: List[str], wrapper: Optional[Callable[[ModelClient], ModelClient]] = None,
+                 factory: Optional[Callable[[str], ModelClient]] = None):
+        self._names = list(names)
+        self._wrapper = wrapper
+        self._factory = factory or (lambda name: PROVIDERS.get(name)())
+        self._clients: Dict[str, ModelClient] = {}
+
+    def __getitem__(self, name: str) -> ModelClient:
+        if name not in self._names:
+            raise KeyError(name)
+        if name not in self._clients:
+            client = self._factory(name)
+            self._clients[name] = self._wrapper(client) if self._wrapper else client
+        return self._clients[name]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._names)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+def configured_providers() -> List[str]:
+    # STRESSTEST_PROVIDERS=claude,llama overrides the defaults; a local endpoint opts itself in
+    if os.getenv('STRESSTEST_PROVIDERS'):
+        return [name.strip() for name in os.getenv('STRESSTEST_PROVIDERS').split(",") if name.strip()]
+    providers = list(DEFAULT_PROVIDERS)
+    if os.getenv('LLAMA_BASE_URL'):
+        providers.append("llama")
+    return providers
 
 class MultiModelManager:
-    def __init__(self):
+    def __init__(self, providers: Optional[List[str]] = None,
+                 semantic_cache_threshold: Optional[float] = None,
+                 record_path: Optional[str] = None, replay_path: Optional[str] = None,
+                 replay_latency_scale: Optional[float] = None):
+        from dotenv import load_dotenv
         load_dotenv()
         
-        self.clients = {
-            "claude": AnthropicClient(os.getenv('ANTHROPIC_API_KEY')),
-            "gpt4": OpenAIClient(os.getenv('OPENAI_API_KEY')),
-            "gemini": GeminiClient(os.getenv('GOOGLE_API_KEY'))
-        }
+        # Record live provider traffic to a cassette, or replay one offline without API keys
+        record_path = record_path or os.getenv('STRESSTEST_RECORD')
+        replay_path = replay_path or os.getenv('STRESSTEST_REPLAY')
+        if replay_latency_scale is None:
+            replay_latency_scale = float(os.getenv('STRESSTEST_REPLAY_LATENCY_SCALE', '0'))
+        self.cassette = None
+        factory = None
+        if replay_path:
+            from utils.cassette import Cassette, ReplayClient
+            self.cassette = Cassette.load(replay_path)
+            providers = providers or self.cassette.providers
+            factory = lambda name: ReplayClient(self.cassette, name, replay_latency_scale)
+        elif record_path:
+            import atexit
+            from utils.cassette import Cassette, RecordingClient
+            # Entries are flushed as they are recorded; closing only finalizes the gzip stream
+            self.cassette = Cassette(record_path)
+            atexit.register(self.cassette.close)
+            factory = lambda name: RecordingClient(PROVIDERS.get(name)(), self.cassette, name)
+        
+        # Exploratory sweeps only: near-duplicate prompts reuse an earlier response
+        if semantic_cache_threshold is None and os.getenv('STRESSTEST_SEMANTIC_CACHE'):
+            semantic_cache_threshold = float(os.getenv('STRESSTEST_SEMANTIC_CACHE'))
+        wrapper = None
+        if semantic_cache_threshold is not None:
+            from utils.semantic_cache import CachedModelClient, SemanticCache
+            wrapper = lambda client: CachedModelClient(client, SemanticCache(semantic_cache_threshold))
+        self.clients = LazyClients(providers or configured_providers(), wrapper, factory)
     
     async def generate_responses(self, prompt: str) -> Dict[str, str]:
         responses = {}
-        for model_name, client in self.clients.items():
+        for model_name in self.clients:
             try:
-                responses[model_name] = await client.generate_response(prompt)
+                responses[model_name] = await self.clients[model_name].generate_response(prompt)
             except Exception as e:
                 print(f"Error with {model_name}: {str(e)}")
                 responses[model_name] = f"ERROR: {str(e)}"
-        return responses
\ No newline at end of file
+        return responses
+
+    def close(self):
+        if self.cassette is not None:
+            self.cassette.close()
+
+    def cache_report(self) -> Dict[str, Dict[str, float]]:
+        """Semantic cache hit rate and saved latency per provider instantiated so far"""
+        return {
+            name: client.cache.report()
+            for name, client in self.clients._clients.items()
+            if hasattr(client, "cache")
+        }
\ No newline at end of file
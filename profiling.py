@@ -0,0 +1,173 @@
+import functools
+import inspect
+import json
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from typing import Deque, Dict, Optional
+
+# Upper bounds in seconds; covers heuristic scans (sub-ms) up to slow provider calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Trace events kept for export; older ones are dropped so long runs don't grow without bound
+DEFAULT_MAX_TRACE_EVENTS = 200_000
+
+_NULL_SPAN = nullcontext()
+
+
+def _current_task():
+    # asyncio costs ~100ms to import; code with a running task has already imported it
+    asyncio = sys.modules.get("asyncio")
+    if asyncio is None:
+        return None
+    try:
+        return asyncio.current_task()
+    except RuntimeError:  # No running event loop in this thread
+        return None
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+class Profiler:
+    """Per-stage timers with histogram aggregation and Chrome trace export.
+
+    Disabled by default; set STRESSTEST_PROFILE=1 or call enable(). When
+    disabled, span() and timed() cost a single attribute check per call.
+
+    Spans opened inside an asyncio task are traced as async (b/e) events
+    keyed on that task, so concurrent coroutines on one event loop thread get
+    their own tracks instead of overlapping complete events on a single tid.
+    Only the most recent `max_trace_events` trace events are kept; histograms
+    cover every span.
+    """
+
+    def __init__(self, enabled: bool = False, max_trace_events: int = DEFAULT_MAX_TRACE_EVENTS):
+        self.enabled = enabled
+        self.max_trace_events = max_trace_events
+        self.histograms: Dict[str, Histogram] = {}
+        self.trace_events: Deque[Dict] = deque(maxlen=max_trace_events)
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        with self._lock:
+            self.histograms = {}
+            self.trace_events = deque(maxlen=self.max_trace_events)
+            self._origin = time.perf_counter()
+
+    def record(self, stage: str, start: float, duration: float):
+        with self._lock:
+            if stage not in self.histograms:
+                self.histograms[stage] = Histogram()
+            self.histograms[stage].observe(duration)
+            event = {
+                "name": stage,
+                "cat": stage.split(".")[0],
+                "ts": (start - self._origin) * 1e6,
+                "pid": os.getpid(),
+                "tid": threading.get_ident()
+            }
+            task = _current_task()
+            if task is None:
+                self.trace_events.append({**event, "ph": "X", "dur": duration * 1e6})
+            else:
+                # One async track per task; spans nested within a task nest on its track
+                event["id"] = id(task)
+                self.trace_events.append({**event, "ph": "b"})
+                self.trace_events.append({**event, "ph": "e", "ts": event["ts"] + duration * 1e6})
+
+    @contextmanager
+    def _span(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, start, time.perf_counter() - start)
+
+    def span(self, stage: str):
+        """Context manager timing the enclosed block as `stage`"""
+        if not self.enabled:
+            return _NULL_SPAN
+        return self._span(stage)
+
+    def timed(self, stage: str):
+        """Decorator timing every call of a sync or async function as `stage`"""
+        def decorator(func):
+            if inspect.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    if not self.enabled:
+                        return await func(*args, **kwargs)
+                    with self._span(stage):
+                        return await func(*args, **kwargs)
+                return async_wrapper
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with self._span(stage):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        return {
+            stage: {"count": h.count, "total": h.total, "mean": h.total / h.count if h.count else 0.0}
+            for stage, h in self.histograms.items()
+        }
+
+    def export_prometheus(self, metric_name: str = "stresstest_stage_seconds") -> str:
+        lines = [
+            f"# HELP {metric_name} Time spent per evaluation stage",
+            f"# TYPE {metric_name} histogram"
+        ]
+        with self._lock:
+            for stage, h in sorted(self.histograms.items()):
+                cumulative = 0
+                for bound, count in zip(h.buckets, h.counts):
+                    cumulative += count
+                    lines.append(f'{metric_name}_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+                lines.append(f'{metric_name}_bucket{{stage="{stage}",le="+Inf"}} {h.count}')
+                lines.append(f'{metric_name}_sum{{stage="{stage}"}} {h.total}')
+                lines.append(f'{metric_name}_count{{stage="{stage}"}} {h.count}')
+        return "\n".join(lines) + "\n"
+
+    def export_chrome_trace(self, path: Optional[str] = None) -> Dict:
+        """Trace in the Chrome trace event format (open in chrome://tracing or Perfetto)"""
+        with self._lock:
+            trace = {"traceEvents": list(self.trace_events), "displayTimeUnit": "ms"}
+        if path:
+            with open(path, "w") as f:
+                json.dump(trace, f)
+        return trace
+
+    def export_run(self, run_name: str, directory: str = "."):
+        """Write <run_name>.prom and <run_name>.trace.json"""
+        with open(os.path.join(directory, f"{run_name}.prom"), "w") as f:
+            f.write(self.export_prometheus())
+        self.export_chrome_trace(os.path.join(directory, f"{run_name}.trace.json"))
+
+
+profiler = Profiler(enabled=os.getenv("STRESSTEST_PROFILE", "") not in ("", "0"))
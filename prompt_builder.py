@@ -0,0 +1,202 @@
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+# Rough characters-per-token ratios used when no exact tokenizer is available
+CHARS_PER_TOKEN = {"claude": 3.5, "gpt4": 4.0, "gemini": 4.0}
+
+SCENARIO_HEADER = """You are coordinating the response to an ongoing crisis: {scenario_name}.
+Respond with the sections ASSESSMENT, DECISION, REASONING, CONSEQUENCES.
+"""
+
+# Shortest prompt prefix each provider will cache; shorter prefixes are always billed in full
+MIN_CACHEABLE_TOKENS = {"claude": 1024, "gpt4": 1024}
+
+
+class TokenCounter:
+    """Token counts per provider; exact for OpenAI when tiktoken is installed"""
+
+    def __init__(self, provider: str):
+        self.provider = provider
+        self._encoding = None
+        if provider == "gpt4":
+            try:
+                import tiktoken
+                self._encoding = tiktoken.encoding_for_model("gpt-4")
+            except ImportError:
+                pass
+
+    def count(self, text: str) -> int:
+        if self._encoding is not None:
+            return len(self._encoding.encode(text))
+        return int(len(text) / CHARS_PER_TOKEN.get(self.provider, 4.0)) + 1
+
+
+def compact_text(text: str) -> str:
+    """Collapse whitespace runs and drop exact duplicate lines"""
+    seen = set()
+    lines = []
+    for line in text.splitlines():
+        line = re.sub(r"[ \t]+", " ", line).strip()
+        if not line or line in seen:
+            continue
+        seen.add(line)
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def compact_response(text: str, counter: Optional[TokenCounter] = None,
+                     max_tokens: Optional[int] = None) -> str:
+    """Compact a response for re-inclusion in a prompt, keeping head and tail if over budget.
+
+    Without a budget the response is returned exactly as written.
+    """
+    if counter is None or max_tokens is None:
+        return text
+    text = compact_text(text)
+    if counter.count(text) <= max_tokens:
+        return text
+    # Keep the opening (assessment/decision) and the ending (consequences)
+    keep_chars = int(max_tokens * CHARS_PER_TOKEN.get(counter.provider, 4.0))
+    head = text[:keep_chars * 2 // 3]
+    tail = text[-(keep_chars // 3):]
+    return f"{head}\n[...]\n{tail}"
+
+
+@dataclass
+class PackedPrompt:
+    prefix: str  # Everything before this event's own lines; the previous event's prompt extends to here
+    body: str
+    tokens: int
+    prefix_tokens: int
+    baseline_tokens: int  # Tokens the unpacked build_event_prompt would have used
+    context: Dict[str, Any] = field(default_factory=dict)  # Facts actually sent, after budget packing
+    cacheable: bool = False  # Prefix is long enough for the provider to cache it
+    segments: List[str] = field(default_factory=list)  # prefix split at line boundaries, for cache breakpoints
+
+    @property
+    def text(self) -> str:
+        return self.prefix + self.body
+
+
+def _update_line(event: Any) -> str:
+    facts = "; ".join(f"{key}={value}" for key, value in event.context_update.items())
+    return f"- {event.event_type}: {facts}\n"
+
+
+class PromptBuilder:
+    """Packs accumulated scenario context into a token budget per provider.
+
+    Context is written as an append-only log of each event's updates (later
+    entries supersede earlier ones), so event N's prompt starts with the
+    whole of event N-1's prompt up to its new-event line and the cacheable
+    prefix grows with the scenario. When the log would exceed
+    max_context_tokens it restarts from a snapshot of the latest facts
+    (most recently changed first, within half the budget) and grows again
+    from there; that one prompt misses the cache. Cached token counts come
+    from provider usage (record_usage), never from assuming the prefix was
+    cached.
+    """
+
+    def __init__(self, scenario_name: str, provider: str, max_context_tokens: int = 512):
+        self.scenario_name = scenario_name
+        self.provider = provider
+        self.counter = TokenCounter(provider)
+        self.max_context_tokens = max_context_tokens
+        self.header = (SCENARIO_HEADER.format(scenario_name=scenario_name)
+                       + "Situation log (later entries supersede earlier ones):\n")
+        self._epochs: Optional[List[int]] = None  # Index of the event whose log segment each event belongs to
+        self._snapshots: Dict[int, Dict[str, Any]] = {}
+        self.stats = {"prompts": 0, "tokens": 0, "baseline_tokens": 0, "cached_input_tokens": 0}
+
+    def _pack_context(self, events: List[Any], upto: int, budget: int) -> Dict[str, Any]:
+        # Later updates overwrite earlier values; remember when each key last changed
+        latest: Dict[str, Any] = {}
+        updated_at: Dict[str, int] = {}
+        for index, event in enumerate(events[:upto + 1]):
+            for key, value in event.context_update.items():
+                if key not in latest or latest[key] != value:
+                    updated_at[key] = index
+                latest[key] = value
+
+        # Most recently changed facts first, so the budget drops the stalest ones
+        packed: Dict[str, Any] = {}
+        used = 0
+        for key in sorted(latest, key=lambda k: -updated_at[k]):
+            cost = self.counter.count(f"{key}={latest[key]}")
+            if used + cost > budget:
+                break
+            packed[key] = latest[key]
+            used += cost
+        return packed
+
+    def _plan(self, events: List[Any]):
+        # Decided once from the whole scenario so every event's prompt is the same whichever worker builds it
+        self._epochs = []
+        epoch, used = 0, 0
+        for index, event in enumerate(events):
+            cost = self.counter.count(_update_line(event)) if event.context_update else 0
+            if index > epoch and used + cost > self.max_context_tokens:
+                epoch = index
+                self._snapshots[epoch] = self._pack_context(events, index - 1, self.max_context_tokens // 2)
+                used = self.counter.count(self._snapshot_line(self._snapshots[epoch]))
+            used += cost
+            self._epochs.append(epoch)
+
+    @staticmethod
+    def _snapshot_line(snapshot: Dict[str, Any]) -> str:
+        return f"- current: {'; '.join(f'{key}={value}' for key, value in snapshot.items())}\n"
+
+    def build(self, events: List[Any], index: int) -> PackedPrompt:
+        from utils.evaluator import accumulate_context, build_event_prompt
+
+        if self._epochs is None:
+            self._plan(events)
+        epoch = self._epochs[index]
+        event = events[index]
+
+        segments = [self.header]
+        context: Dict[str, Any] = {}
+        if epoch in self._snapshots:
+            segments[0] += self._snapshot_line(self._snapshots[epoch])
+            context.update(self._snapshots[epoch])
+        for previous in events[epoch:index]:
+            if previous.context_update:
+                segments.append(_update_line(previous))
+                context.update(previous.context_update)
+        context.update(event.context_update)
+
+        prefix = "".join(segments)
+        body = (
+            (_update_line(event) if event.context_update else "")
+            + f"New event ({event.event_type}, severity {event.severity_level}/5): "
+            f"{compact_text(event.description)}"
+        )
+        prefix_tokens = self.counter.count(prefix)
+        tokens = prefix_tokens + self.counter.count(body)
+        baseline = self.counter.count(
+            build_event_prompt(self.scenario_name, event, accumulate_context(events, index))
+        )
+
+        self.stats["prompts"] += 1
+        self.stats["tokens"] += tokens
+        self.stats["baseline_tokens"] += baseline
+        return PackedPrompt(
+            prefix, body, tokens, prefix_tokens, baseline, context=context,
+            cacheable=prefix_tokens >= MIN_CACHEABLE_TOKENS.get(self.provider, float("inf")),
+            segments=segments
+        )
+
+    def record_usage(self, response: Any):
+        """Count the input tokens the provider reports it served from its prompt cache"""
+        usage = getattr(response, "usage", None) or {}
+        self.stats["cached_input_tokens"] += usage.get("cached_input_tokens", 0)
+
+    def report(self) -> Dict[str, int]:
+        # Cached input tokens are billed at a discount and skip prefill on caching providers
+        billed = self.stats["tokens"] - self.stats["cached_input_tokens"]
+        return {
+            **self.stats,
+            "tokens_saved": self.stats["baseline_tokens"] - self.stats["tokens"],
+            "uncached_tokens_saved": self.stats["baseline_tokens"] - billed
+        }
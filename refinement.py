@@ -0,0 +1,153 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Mapping, Optional
+
+import numpy as np
+
+from utils.batch_evaluator import METRIC_NAMES, BatchEvaluator
+from utils.evaluator import EnhancedEvaluator, EnhancedMetrics, FeedbackData
+from utils.model_clients import ModelClient
+from utils.prompt_builder import TokenCounter
+
+
+@dataclass
+class RefinementResult:
+    response: str
+    metrics: EnhancedMetrics
+    score: float
+    improvement_areas: List[str]
+    rounds: int
+    candidates: int
+    tokens_used: int
+    elapsed: float
+    stop_reason: str  # "cleared", "no_improvement", "max_rounds", "latency_budget" or "token_budget"
+    history: List[Dict[str, Any]] = field(default_factory=list)
+
+
+def _metrics_from_row(row: np.ndarray) -> EnhancedMetrics:
+    return EnhancedMetrics(**{name: float(value) for name, value in zip(METRIC_NAMES, row)})
+
+
+class RefinementSweep:
+    """Iterative revision: K concurrent candidates per round across providers, best one kept.
+
+    Each round asks `candidates_per_round` revisions of the current best
+    response (spread round-robin over `clients`), scores them together with
+    BatchEvaluator and keeps the top scorer if it beats the current best.
+    Stops once generate_feedback reports no improvement areas, or when the
+    round, latency or token budget for the event runs out. A round only
+    starts if every candidate's prompt plus `max_output_tokens` still fits
+    the token budget; tokens are charged from provider-reported usage when
+    a response carries it and estimated per provider otherwise.
+    """
+
+    def __init__(self, evaluator: EnhancedEvaluator, clients: Mapping[str, ModelClient],
+                 candidates_per_round: int = 3, max_rounds: int = 3, latency_budget: float = 60.0,
+                 token_budget: int = 20000, min_improvement: float = 0.01, max_output_tokens: int = 1024):
+        self.evaluator = evaluator
+        self.clients = clients
+        self.batch_evaluator = BatchEvaluator(evaluator)
+        self.candidates_per_round = candidates_per_round
+        self.max_rounds = max_rounds
+        self.latency_budget = latency_budget
+        self.token_budget = token_budget
+        self.min_improvement = min_improvement
+        # Output cap of every provider client; reserved per candidate before a round starts
+        self.max_output_tokens = max_output_tokens
+        self.counters = {provider: TokenCounter(provider) for provider in clients}
+
+    async def _candidate(self, provider: str, prompt: str) -> Optional[str]:
+        # Keeps the ModelResponse (if the client returns one) so its usage can be charged
+        try:
+            return await self.clients[provider].generate_response(prompt)
+        except Exception as e:
+            print(f"Error generating revision with {provider}: {e}")
+            return None
+
+    def _tokens(self, provider: str, prompt: str, response: Optional[str]) -> int:
+        usage = getattr(response, "usage", None)
+        if usage and (usage["input_tokens"] or usage["output_tokens"]):
+            return (usage["input_tokens"] + usage["cached_input_tokens"] + usage["cache_write_input_tokens"]
+                    + usage["output_tokens"])
+        counter = self.counters[provider]
+        return counter.count(prompt) + (counter.count(response) if response is not None else 0)
+
+    async def refine(self, feedback_data: FeedbackData, context: Dict[str, Any]) -> RefinementResult:
+        start = time.perf_counter()
+        providers = list(self.clients)
+        best_response = feedback_data.original_response
+        best_metrics = feedback_data.metrics
+        best_score = float(np.nanmean(list(best_metrics.__dict__.values())))
+        improvement_areas = feedback_data.improvement_areas
+        prompt = feedback_data.feedback_prompt
+        tokens_used = 0
+        candidates_total = 0
+        history = []
+        stop_reason = "max_rounds"
+
+        for round_index in range(self.max_rounds):
+            if not improvement_areas:
+                stop_reason = "cleared"
+                break
+            remaining = self.latency_budget - (time.perf_counter() - start)
+            if remaining <= 0:
+                stop_reason = "latency_budget"
+                break
+            # Don't start a round that could overrun the token budget if every candidate
+            # used its full output allowance
+            round_providers = [providers[i % len(providers)] for i in range(self.candidates_per_round)]
+            reserved = sum(self.counters[p].count(prompt) + self.max_output_tokens for p in round_providers)
+            if tokens_used + reserved > self.token_budget:
+                stop_reason = "token_budget"
+                break
+
+            tasks = [asyncio.create_task(self._candidate(p, prompt)) for p in round_providers]
+            done, pending = await asyncio.wait(tasks, timeout=remaining)
+            for task in pending:
+                task.cancel()
+            # Abandoned candidates were still sent their prompt
+            tokens_used += sum(
+                self._tokens(p, prompt, t.result() if t in done else None)
+                for p, t in zip(round_providers, tasks)
+            )
+            candidates = [str(t.result()) for t in tasks if t in done and t.result() is not None]
+            candidates_total += len(candidates)
+            if not candidates:
+                stop_reason = "latency_budget" if pending else "no_improvement"
+                break
+
+            matrix = self.batch_evaluator.evaluate_batch(
+                [{"revision": c} for c in candidates], [context] * len(candidates)
+            )
+            scores = np.nanmean(matrix, axis=1)
+            best_index = int(np.argmax(scores))
+            history.append({"round": round_index, "candidates": len(candidates),
+                            "scores": scores.tolist(), "timed_out": len(pending)})
+
+            if scores[best_index] < best_score + self.min_improvement:
+                stop_reason = "no_improvement"
+                break
+            best_response = candidates[best_index]
+            best_metrics = _metrics_from_row(matrix[best_index])
+            best_score = float(scores[best_index])
+            improvement_areas, prompt = self.evaluator.generate_feedback(best_metrics, best_response)
+            if pending:
+                stop_reason = "latency_budget"
+                break
+        else:
+            if not improvement_areas:
+                stop_reason = "cleared"
+
+        return RefinementResult(
+            response=best_response,
+            metrics=best_metrics,
+            score=best_score,
+            improvement_areas=improvement_areas,
+            rounds=len(history),
+            candidates=candidates_total,
+            tokens_used=tokens_used,
+            elapsed=time.perf_counter() - start,
+            stop_reason=stop_reason,
+            history=history
+        )
@@ -0,0 +1,42 @@
+from typing import Callable, Dict, List
+
+
+class Registry:
+    """Name -> factory registry, extendable by other packages through entry points.
+
+    Factories are only called (and their SDKs only imported) when a name is
+    first requested, so registering a provider or scorer costs nothing at
+    import time.
+    """
+
+    def __init__(self, kind: str, entry_point_group: str):
+        self.kind = kind
+        self.entry_point_group = entry_point_group
+        self._factories: Dict[str, Callable] = {}
+        self._entry_points_loaded = False
+
+    def register(self, name: str):
+        def decorator(factory: Callable) -> Callable:
+            self._factories[name] = factory
+            return factory
+        return decorator
+
+    def _load_entry_points(self):
+        if self._entry_points_loaded:
+            return
+        self._entry_points_loaded = True
+        from importlib.metadata import entry_points
+        for entry_point in entry_points(group=self.entry_point_group):
+            # Built-in registrations take precedence over plugins with the same name
+            self._factories.setdefault(entry_point.name, entry_point.load())
+
+    def get(self, name: str) -> Callable:
+        if name not in self._factories:
+            self._load_entry_points()
+        if name not in self._factories:
+            raise KeyError(f"Unknown {self.kind} '{name}'. Available: {', '.join(self.names())}")
+        return self._factories[name]
+
+    def names(self) -> List[str]:
+        self._load_entry_points()
+        return sorted(self._factories)
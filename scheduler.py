@@ -0,0 +1,184 @@
+import asyncio
+import heapq
+import itertools
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from utils.evaluator import SimulationEvent
+from utils.profiling import profiler
+
+
+def event_priority(event: SimulationEvent) -> int:
+    """Higher runs first: severity 1-5, action-required events ahead of same-severity updates"""
+    return event.severity_level * 2 + int(bool(event.required_action))
+
+
+@dataclass
+class ScheduledJob:
+    provider: str
+    priority: int
+    payload: Any
+    enqueued_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Any = None
+    error: Optional[BaseException] = None
+
+
+class GlobalScheduler:
+    """Priority scheduler for provider calls with global and per-provider in-flight limits.
+
+    Jobs wait in one heap per provider. Whenever a slot frees up, the
+    highest-priority waiting job among providers that are under their own
+    limit is started, so a saturated provider never blocks the others.
+    submit() blocks while max_queue_depth jobs are already waiting, which
+    pushes back on whatever is generating work instead of buffering the
+    whole sweep in memory.
+    """
+
+    def __init__(self, handler: Callable[[ScheduledJob], Awaitable[Any]], max_in_flight: int = 16,
+                 provider_limits: Optional[Dict[str, int]] = None, default_provider_limit: Optional[int] = None,
+                 max_queue_depth: int = 256):
+        self.handler = handler
+        self.max_in_flight = max_in_flight
+        self.provider_limits = provider_limits or {}
+        self.default_provider_limit = default_provider_limit or max_in_flight
+        self.max_queue_depth = max_queue_depth
+
+        self._queues: Dict[str, List[Tuple[int, int, ScheduledJob]]] = defaultdict(list)
+        self._sequence = itertools.count()
+        self._condition = asyncio.Condition()
+        self._tasks = set()
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._closing = False
+
+        self.depth = 0
+        self.in_flight = 0
+        self.provider_in_flight: Dict[str, int] = defaultdict(int)
+        self.max_depth_seen = 0
+        self.completed = 0
+        self.failed = 0
+        self.backpressure_seconds = 0.0
+        self.waits: Dict[int, List[float]] = defaultdict(list)
+
+    def _limit(self, provider: str) -> int:
+        return self.provider_limits.get(provider, self.default_provider_limit)
+
+    def start(self):
+        if self._dispatcher is None:
+            self._dispatcher = asyncio.create_task(self._dispatch())
+
+    async def submit(self, provider: str, priority: int, payload: Any) -> ScheduledJob:
+        self.start()
+        async with self._condition:
+            if self.depth >= self.max_queue_depth:
+                blocked = time.perf_counter()
+                await self._condition.wait_for(lambda: self.depth < self.max_queue_depth)
+                self.backpressure_seconds += time.perf_counter() - blocked
+            job = ScheduledJob(provider, priority, payload, time.perf_counter())
+            heapq.heappush(self._queues[provider], (-priority, next(self._sequence), job))
+            self.depth += 1
+            self.max_depth_seen = max(self.max_depth_seen, self.depth)
+            self._condition.notify_all()
+        return job
+
+    def _next_job(self) -> Optional[ScheduledJob]:
+        if self.in_flight >= self.max_in_flight:
+            return None
+        best = None
+        for provider, queue in self._queues.items():
+            if queue and self.provider_in_flight[provider] < self._limit(provider):
+                if best is None or queue[0][:2] < self._queues[best][0][:2]:
+                    best = provider
+        if best is None:
+            return None
+        return heapq.heappop(self._queues[best])[2]
+
+    async def _dispatch(self):
+        async with self._condition:
+            while True:
+                job = self._next_job()
+                if job is None:
+                    if self._closing and self.depth == 0:
+                        return
+                    await self._condition.wait()
+                    continue
+                self.depth -= 1
+                self.in_flight += 1
+                self.provider_in_flight[job.provider] += 1
+                job.started_at = time.perf_counter()
+                wait = job.started_at - job.enqueued_at
+                self.waits[job.priority].append(wait)
+                if profiler.enabled:
+                    profiler.record(f"scheduler.wait.priority_{job.priority}", job.enqueued_at, wait)
+                task = asyncio.create_task(self._run(job))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+                # Waiting submitters can refill the slot this job just left
+                self._condition.notify_all()
+
+    async def _run(self, job: ScheduledJob):
+        try:
+            job.result = await self.handler(job)
+        except Exception as e:
+            job.error = e
+        finally:
+            job.finished_at = time.perf_counter()
+            async with self._condition:
+                self.in_flight -= 1
+                self.provider_in_flight[job.provider] -= 1
+                if job.error is None:
+                    self.completed += 1
+                else:
+                    self.failed += 1
+                self._condition.notify_all()
+
+    async def join(self):
+        """Wait until every submitted job has finished"""
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.depth == 0 and self.in_flight == 0)
+
+    async def close(self):
+        await self.join()
+        async with self._condition:
+            self._closing = True
+            self._condition.notify_all()
+        if self._dispatcher is not None:
+            await self._dispatcher
+            self._dispatcher = None
+
+    def stats(self) -> Dict[str, Any]:
+        waits = {}
+        for priority, samples in sorted(self.waits.items(), reverse=True):
+            p50, p95 = np.percentile(samples, [50, 95])
+            waits[priority] = {"jobs": len(samples), "wait_p50": float(p50), "wait_p95": float(p95)}
+        return {
+            "queue_depth": self.depth,
+            "max_queue_depth": self.max_depth_seen,
+            "in_flight": self.in_flight,
+            "provider_in_flight": dict(self.provider_in_flight),
+            "completed": self.completed,
+            "failed": self.failed,
+            "backpressure_seconds": self.backpressure_seconds,
+            "wait_by_priority": waits
+        }
+
+
+async def run_sweep(scenarios: Iterable[Tuple[str, List[SimulationEvent]]], models: List[str],
+                    handler: Callable[[ScheduledJob], Awaitable[Any]], **limits) -> Dict[str, Any]:
+    """Schedule every (scenario, event, model) call, generating work only as fast as the queue drains.
+
+    `scenarios` may be a lazy iterable of (name, events) pairs; each job's
+    payload is (scenario name, event index, events) and its provider is the model.
+    """
+    scheduler = GlobalScheduler(handler, **limits)
+    for name, events in scenarios:
+        for index, event in enumerate(events):
+            for model in models:
+                await scheduler.submit(model, event_priority(event), (name, index, events))
+    await scheduler.close()
+    return scheduler.stats()
@@ -0,0 +1,207 @@
+import glob
+import hashlib
+import inspect
+import json
+import math
+import sqlite3
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional
+
+from utils import text_analyzer, tokenization
+from utils.evaluator import (
+    ANALYSIS_INDICATORS, REASONING_INDICATORS, EnhancedEvaluator, EnhancedMetrics
+)
+from utils.text_analyzer import analyze_text
+from utils.tokenization import tokenize_responses
+
+METRIC_NAMES = list(EnhancedMetrics.__dataclass_fields__)
+
+# The shared word/sentence split (see tokenization.py) and lexical pass (see text_analyzer.py).
+# Every lexicon compiles into one longest-match-first pattern, so a term added to one category can
+# take matches away from another: each lexical metric is versioned on all of LEXICONS.
+_WORD_SPLIT = [
+    tokenization.tokenize_responses, tokenization.TokenizedResponse,
+    tokenization._WORD_SPAN, tokenization._NONEMPTY_SENTENCE
+]
+_LEXICAL_ANALYZER = _WORD_SPLIT + [
+    text_analyzer.analyze_text, text_analyzer.TextAnalysis, text_analyzer._build_index,
+    # Constants go in a list: bare strings name EnhancedEvaluator methods (see _source)
+    text_analyzer._categories_for, [text_analyzer._PUNCTUATION], text_analyzer.LEXICONS
+]
+
+# What each metric's score depends on besides its own _evaluate_<metric> method.
+# Editing any of these changes the metric's scorer version and invalidates its cached scores.
+SCORER_DEPENDENCIES: Dict[str, List[Any]] = {
+    "response_quality": ["classifier", "chunked_classifier", tokenization],
+    "reasoning_depth": [REASONING_INDICATORS] + _WORD_SPLIT,
+    "contextual_understanding": [
+        "_extract_context_keywords", "_evaluate_context_application",
+        "_get_surrounding_text", "_is_meaningful_reference", ANALYSIS_INDICATORS
+    ]
+}
+for _metric in ["safety_consideration", "ethical_alignment", "decisiveness", "innovation",
+                "risk_assessment", "stakeholder_consideration", "long_term_thinking"]:
+    SCORER_DEPENDENCIES[_metric] = _LEXICAL_ANALYZER
+
+
+def _hash(value: Any) -> str:
+    return hashlib.sha1(json.dumps(value, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _source(evaluator: EnhancedEvaluator, dependency: Any) -> str:
+    if dependency == "classifier":
+        return f"{evaluator.classifier}:chunked" if evaluator.chunked_quality else evaluator.classifier
+    if dependency == "chunked_classifier":
+        if not evaluator.chunked_quality:
+            return ""
+        from utils.chunked_scoring import ChunkedClassifier
+        return inspect.getsource(ChunkedClassifier)
+    if isinstance(dependency, str):
+        return inspect.getsource(inspect.unwrap(getattr(type(evaluator), dependency)))
+    if inspect.ismodule(dependency) or inspect.isfunction(dependency) or inspect.isclass(dependency):
+        return inspect.getsource(inspect.unwrap(dependency))
+    return repr(dependency)
+
+
+def scorer_version(evaluator: EnhancedEvaluator, metric: str) -> str:
+    """Hash of the source of everything the metric's score is computed from"""
+    parts = [_source(evaluator, f"_evaluate_{metric}")]
+    parts += [_source(evaluator, d) for d in SCORER_DEPENDENCIES.get(metric, [])]
+    return hashlib.sha1("\n".join(parts).encode()).hexdigest()[:12]
+
+
+class ScoreCache:
+    """On-disk per-metric scores keyed by (response hash, context hash, metric, scorer version)"""
+
+    def __init__(self, db_path: str = "score_cache.db"):
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS scores (
+                response_hash TEXT NOT NULL,
+                context_hash TEXT NOT NULL,
+                metric TEXT NOT NULL,
+                version TEXT NOT NULL,
+                value REAL,
+                PRIMARY KEY (response_hash, context_hash, metric, version)
+            )
+        """)
+
+    def get_many(self, response_hash: str, context_hash: str, versions: Dict[str, str]) -> Dict[str, float]:
+        rows = self.conn.execute(
+            "SELECT metric, version, value FROM scores WHERE response_hash = ? AND context_hash = ?",
+            (response_hash, context_hash)
+        ).fetchall()
+        # SQLite stores NaN as NULL; nothing else is ever stored as NULL
+        return {metric: math.nan if value is None else value
+                for metric, version, value in rows if versions.get(metric) == version}
+
+    def put_many(self, response_hash: str, context_hash: str, values: Dict[str, float], versions: Dict[str, str]):
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO scores VALUES (?, ?, ?, ?, ?)",
+            [(response_hash, context_hash, m, versions[m], v) for m, v in values.items()]
+        )
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+class CachedScorer:
+    """Scores responses like EnhancedEvaluator.evaluate_response, recomputing only stale metrics"""
+
+    def __init__(self, evaluator: EnhancedEvaluator, cache: ScoreCache):
+        self.evaluator = evaluator
+        self.cache = cache
+        self.versions = {metric: scorer_version(evaluator, metric) for metric in METRIC_NAMES}
+        self.stats = {"reused": defaultdict(int), "computed": defaultdict(int)}
+
+    def _compute(self, metric: str, response: Dict[str, str], context: Dict[str, Any],
+                 analysis_holder: Dict[str, Any]) -> float:
+        scorer: Callable = getattr(self.evaluator, f"_evaluate_{metric}")
+        response_text = " ".join(response.values())
+        if metric == "response_quality":
+            return scorer(response)
+        if metric == "contextual_understanding":
+            return scorer(response, context)
+        # Word and sentence split shared by reasoning depth and the lexical pass
+        if "tokenized" not in analysis_holder:
+            analysis_holder["tokenized"] = tokenize_responses([response_text])[0]
+        if metric == "reasoning_depth":
+            return scorer(response_text, analysis_holder["tokenized"])
+        if "analysis" not in analysis_holder:
+            analysis_holder["analysis"] = analyze_text(response_text, analysis_holder["tokenized"])
+        return scorer(analysis_holder["analysis"])
+
+    def evaluate_response(self, response: Dict[str, str], context: Dict[str, Any]) -> EnhancedMetrics:
+        # Every scorer reads the joined text, so responses keyed by different model names share entries
+        response_hash = _hash(" ".join(response.values()))
+        context_hash = _hash(context)
+        values = self.cache.get_many(response_hash, context_hash, self.versions)
+        for metric in values:
+            self.stats["reused"][metric] += 1
+
+        missing = [m for m in METRIC_NAMES if m not in values]
+        if missing:
+            analysis_holder: Dict[str, Any] = {}
+            computed = {m: float(self._compute(m, response, context, analysis_holder)) for m in missing}
+            self.cache.put_many(response_hash, context_hash, computed, self.versions)
+            for metric in computed:
+                self.stats["computed"][metric] += 1
+            values.update(computed)
+        return EnhancedMetrics(**values)
+
+    def report(self) -> Dict[str, Dict[str, float]]:
+        report = {}
+        for metric in METRIC_NAMES:
+            reused = self.stats["reused"][metric]
+            computed = self.stats["computed"][metric]
+            total = reused + computed
+            report[metric] = {"reused": reused, "computed": computed,
+                              "reuse_rate": reused / total if total else 0.0}
+        return report
+
+
+def rescore_feedback_logs(pattern: str, scorer: CachedScorer, output_path: Optional[str] = None) -> int:
+    """Rescore every response in the feedback logs matching `pattern` (JSON lines from store_feedback)"""
+    rescored = 0
+    out = open(output_path, "w") if output_path else None
+    try:
+        for path in sorted(glob.glob(pattern)):
+            with open(path) as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    record = json.loads(line)
+                    context = record.get("context") or {}
+                    for field in ("original_response", "revised_response"):
+                        if not record.get(field):
+                            continue
+                        metrics = scorer.evaluate_response({"response": str(record[field])}, context)
+                        rescored += 1
+                        if out:
+                            json.dump({"source": path, "scenario_id": record["scenario_id"],
+                                       "event_id": record["event_id"], "field": field,
+                                       "metrics": metrics.__dict__}, out)
+                            out.write("\n")
+    finally:
+        if out:
+            out.close()
+    return rescored
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Rescore stored feedback logs, reusing unchanged metric scores")
+    parser.add_argument("pattern", nargs="?", default="feedback_*.json")
+    parser.add_argument("--db", default="score_cache.db")
+    parser.add_argument("--output", default="rescored.jsonl")
+    args = parser.parse_args()
+
+    scorer = CachedScorer(EnhancedEvaluator("rescore", client=None), ScoreCache(args.db))
+    count = rescore_feedback_logs(args.pattern, scorer, args.output)
+    print(f"Rescored {count} responses")
+    for metric, stats in scorer.report().items():
+        print(f"{metric:28} reused {stats['reused']:6}  computed {stats['computed']:6}  "
+              f"({stats['reuse_rate']:.0%} reuse)")
@@ -0,0 +1,154 @@
+import re
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from utils.model_clients import ModelClient
+from utils.registry import Registry
+
+# Sentence embedding backends, loaded on first use
+EMBEDDERS = Registry("embedder", "stresstest.embedders")
+
+
+@EMBEDDERS.register("minilm")
+def _minilm_embedder():
+    from sentence_transformers import SentenceTransformer
+    model = SentenceTransformer("all-MiniLM-L6-v2")
+    return lambda texts: model.encode(texts, normalize_embeddings=True, convert_to_numpy=True)
+
+
+_TIMESTAMP = re.compile(r"\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}(:\d{2}(\.\d+)?)?")
+_NUMBERING = re.compile(r"^\s*(\d+[.)]|[-*•])\s+", re.MULTILINE)
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Strip the trivia that differs between otherwise identical prompts"""
+    text = _TIMESTAMP.sub("<ts>", prompt)
+    text = _NUMBERING.sub("", text)
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+class RandomProjectionIndex:
+    """Approximate nearest neighbours over unit vectors using random-hyperplane LSH.
+
+    Each vector is hashed by the signs of its projections onto `num_planes`
+    random hyperplanes per table; candidates sharing a bucket in any table are
+    re-ranked by exact cosine similarity.
+    """
+
+    def __init__(self, dim: int, num_tables: int = 8, num_planes: int = 10, seed: int = 0):
+        rng = np.random.default_rng(seed)
+        self.planes = rng.standard_normal((num_tables, num_planes, dim)).astype(np.float32)
+        self.powers = 1 << np.arange(num_planes)
+        self.tables: List[Dict[int, List[int]]] = [{} for _ in range(num_tables)]
+        self.vectors: List[np.ndarray] = []
+
+    def _keys(self, vector: np.ndarray) -> np.ndarray:
+        return ((self.planes @ vector) > 0).astype(np.int64) @ self.powers
+
+    def add(self, vector: np.ndarray) -> int:
+        idx = len(self.vectors)
+        self.vectors.append(vector.astype(np.float32))
+        for table, key in zip(self.tables, self._keys(vector)):
+            table.setdefault(int(key), []).append(idx)
+        return idx
+
+    def nearest(self, vector: np.ndarray) -> Tuple[Optional[int], float]:
+        candidates = set()
+        for table, key in zip(self.tables, self._keys(vector)):
+            candidates.update(table.get(int(key), ()))
+        if not candidates:
+            return None, 0.0
+        ids = np.fromiter(candidates, dtype=np.int64)
+        similarities = np.stack([self.vectors[i] for i in ids]) @ vector
+        best = int(np.argmax(similarities))
+        return int(ids[best]), float(similarities[best])
+
+
+class SemanticCache:
+    """Reuses responses for prompts that normalize identically or embed within `threshold`"""
+
+    def __init__(self, threshold: float = 0.97, embedder: str = "minilm"):
+        self.threshold = threshold
+        self.embedder_name = embedder
+        self._embed = None
+        self._index: Optional[RandomProjectionIndex] = None
+        self.exact: Dict[str, int] = {}
+        self.responses: List[str] = []
+        self.latencies: List[float] = []
+        self.stats = {"lookups": 0, "exact_hits": 0, "semantic_hits": 0, "saved_seconds": 0.0}
+
+    def _embedding(self, normalized: str) -> np.ndarray:
+        if self._embed is None:
+            self._embed = EMBEDDERS.get(self.embedder_name)()
+        return np.asarray(self._embed([normalized])[0], dtype=np.float32)
+
+    def lookup(self, prompt: str) -> Tuple[Optional[str], str, Optional[np.ndarray]]:
+        """Return (response or None, normalized prompt, embedding if one was computed)"""
+        self.stats["lookups"] += 1
+        normalized = normalize_prompt(prompt)
+        if normalized in self.exact:
+            idx = self.exact[normalized]
+            self.stats["exact_hits"] += 1
+            self.stats["saved_seconds"] += self.latencies[idx]
+            return self.responses[idx], normalized, None
+        embedding = self._embedding(normalized)
+        if self._index is not None:
+            idx, similarity = self._index.nearest(embedding)
+            if idx is not None and similarity >= self.threshold:
+                self.stats["semantic_hits"] += 1
+                self.stats["saved_seconds"] += self.latencies[idx]
+                return self.responses[idx], normalized, embedding
+        return None, normalized, embedding
+
+    def store(self, normalized: str, embedding: Optional[np.ndarray], response: str, latency: float):
+        idx = len(self.responses)
+        self.responses.append(response)
+        self.latencies.append(latency)
+        self.exact[normalized] = idx
+        if embedding is None:
+            embedding = self._embedding(normalized)
+        if self._index is None:
+            self._index = RandomProjectionIndex(len(embedding))
+        self._index.add(embedding)
+
+    def report(self) -> Dict[str, float]:
+        hits = self.stats["exact_hits"] + self.stats["semantic_hits"]
+        return {**self.stats, "hit_rate": hits / self.stats["lookups"] if self.stats["lookups"] else 0.0}
+
+
+class CachedModelClient(ModelClient):
+    """Wraps a client so near-duplicate prompts are answered from a SemanticCache.
+
+    Intended for exploratory sweeps: a cached answer was generated for a
+    slightly different prompt, so leave it off for scored evaluation runs.
+    """
+
+    def __init__(self, inner: ModelClient, cache: Optional[SemanticCache] = None):
+        self.inner = inner
+        self.cache = cache or SemanticCache()
+
+    def __getattr__(self, name):
+        # Expose the wrapped client's SDK handles (e.g. AnthropicClient.client)
+        return getattr(self.inner, name)
+
+    async def generate_chat(self, messages: List[Dict[str, str]]) -> str:
+        return await self.inner.generate_chat(messages)
+
+    async def _cached(self, prompt: str, call) -> str:
+        cached, normalized, embedding = self.cache.lookup(prompt)
+        if cached is not None:
+            # A plain str: the hit made no provider call, so the cost ledger bills nothing for it
+            return str(cached)
+        start = time.perf_counter()
+        response = await call()
+        self.cache.store(normalized, embedding, response, time.perf_counter() - start)
+        return response
+
+    async def generate_response(self, prompt: str) -> str:
+        return await self._cached(prompt, lambda: self.inner.generate_response(prompt))
+
+    async def generate_packed(self, packed) -> str:
+        # Misses go to the inner client's generate_packed so provider prompt caching still applies
+        return await self._cached(packed.text, lambda: self.inner.generate_packed(packed))
@@ -0,0 +1,194 @@
+import asyncio
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from utils.evaluator import SimulationEvent
+from utils.model_clients import ModelClient, MultiModelManager
+from utils.prompt_builder import SCENARIO_HEADER, TokenCounter, compact_text
+
+SUMMARY_ACK = "Understood. Continuing from the summarized situation."
+
+
+def format_turn(event: SimulationEvent) -> str:
+    # Earlier context already lives in the conversation, so only the delta is sent
+    updates = "; ".join(f"{key}={value}" for key, value in event.context_update.items())
+    return (f"New event ({event.event_type}, severity {event.severity_level}/5): "
+            f"{compact_text(event.description)}\nSituation update: {updates}")
+
+
+def extractive_summary(turns: List[Dict[str, str]]) -> str:
+    """Keep each event line and the model's DECISION line from summarized turns"""
+    lines = []
+    for message in turns:
+        if message["role"] == "user":
+            event_lines = [l for l in message["content"].splitlines() if l.startswith("New event")]
+            lines.append(event_lines[0] if event_lines else message["content"].splitlines()[0])
+        else:
+            match = re.search(r"DECISION[:\s]*(.+)", message["content"])
+            decision = match.group(1) if match else message["content"][:200]
+            lines.append(f"  Decision taken: {decision.strip()[:200]}")
+    return "\n".join(lines)
+
+
+@dataclass
+class TurnRecord:
+    turn: int
+    event_type: str
+    latency: float
+    history_tokens: int
+    history_messages: int
+    summarized: bool
+    response: str
+    error: bool = False  # The provider call failed; response holds the error, not a model turn
+
+
+@dataclass
+class ConversationSession:
+    """One provider's conversation through a scenario, kept within a token budget"""
+    scenario_name: str
+    provider: str
+    client: ModelClient
+    max_history_tokens: int = 4000
+    keep_recent_turns: int = 3
+    summarizer: Callable[[List[Dict[str, str]]], str] = extractive_summary
+    messages: List[Dict[str, str]] = field(default_factory=list)
+    turns: List[TurnRecord] = field(default_factory=list)
+
+    def __post_init__(self):
+        self.counter = TokenCounter(self.provider)
+        self.header = SCENARIO_HEADER.format(scenario_name=self.scenario_name)
+        # Per-message token counts, kept in step with self.messages
+        self._message_tokens: List[int] = []
+        self._summary = ""
+        # Turn content whose provider call failed, resent with the next event
+        self._undelivered = ""
+
+    @property
+    def history_tokens(self) -> int:
+        return sum(self._message_tokens)
+
+    def _append(self, role: str, content: str):
+        self.messages.append({"role": role, "content": content})
+        self._message_tokens.append(self.counter.count(content))
+
+    def _compact_history(self) -> bool:
+        """Fold all but the most recent turns into a summary pair; True if anything was folded"""
+        if self.history_tokens <= self.max_history_tokens:
+            return False
+        # Recent completed turns plus the pending user message
+        keep = self.keep_recent_turns * 2 + 1
+        # Messages 0 and 1 are the header/summary pair once a summary exists
+        start = 2 if self._summary else 0
+        old = self.messages[start:len(self.messages) - keep]
+        if not old:
+            return False
+        self._summary = "\n".join(filter(None, [self._summary, self.summarizer(old)]))
+        recent = self.messages[len(self.messages) - keep:]
+        self.messages = []
+        self._message_tokens = []
+        self._append("user", f"{self.header}Summary of earlier events:\n{self._summary}")
+        self._append("assistant", SUMMARY_ACK)
+        for message in recent:
+            self._append(message["role"], message["content"])
+        return True
+
+    async def step(self, event: SimulationEvent) -> TurnRecord:
+        content = format_turn(event)
+        if self._undelivered:
+            content = f"{self._undelivered}\n\n{content}"
+            self._undelivered = ""
+        elif not self.messages:
+            content = self.header + content
+        self._append("user", content)
+        summarized = self._compact_history()
+
+        history_tokens = self.history_tokens
+        start = time.perf_counter()
+        try:
+            response = await self.client.generate_chat(self.messages)
+        except Exception as e:
+            print(f"Error with {self.provider}: {str(e)}")
+            latency = time.perf_counter() - start
+            # Keep the error out of the conversation; the event is delivered with the next turn instead
+            self._undelivered = self.messages.pop()["content"]
+            self._message_tokens.pop()
+            record = TurnRecord(len(self.turns), event.event_type, latency, history_tokens,
+                                len(self.messages), summarized, f"ERROR: {str(e)}", error=True)
+            self.turns.append(record)
+            return record
+        latency = time.perf_counter() - start
+
+        self._append("assistant", str(response))
+        record = TurnRecord(len(self.turns), event.event_type, latency, history_tokens,
+                            len(self.messages) - 1, summarized, str(response))
+        self.turns.append(record)
+        return record
+
+    def latency_profile(self) -> Dict[str, float]:
+        """How latency grows with context: seconds per 1k history tokens and last/first ratio.
+
+        Failed turns are left out; their fast-fail latency says nothing about context size.
+        """
+        completed = [t for t in self.turns if not t.error]
+        latencies = [t.latency for t in completed]
+        tokens = [t.history_tokens for t in completed]
+        failed = len(self.turns) - len(completed)
+        if len(latencies) < 2:
+            return {"turns": len(latencies), "failed_turns": failed,
+                    "seconds_per_1k_tokens": 0.0, "degradation_ratio": 1.0}
+        slope = np.polyfit(tokens, latencies, 1)[0] if len(set(tokens)) > 1 else 0.0
+        return {
+            "turns": len(latencies),
+            "failed_turns": failed,
+            "first_latency": latencies[0],
+            "last_latency": latencies[-1],
+            "seconds_per_1k_tokens": float(slope * 1000),
+            "degradation_ratio": latencies[-1] / latencies[0] if latencies[0] > 0 else 1.0,
+            "max_history_tokens": max(tokens)
+        }
+
+
+class SessionRunner:
+    """Plays a scenario as one conversation per provider, providers in parallel"""
+
+    def __init__(self, scenario_name: str, events: List[SimulationEvent],
+                 manager: Optional[MultiModelManager] = None, max_history_tokens: int = 4000):
+        self.scenario_name = scenario_name
+        self.events = events
+        self.manager = manager or MultiModelManager()
+        self.sessions = {
+            name: ConversationSession(scenario_name, name, client, max_history_tokens)
+            for name, client in self.manager.clients.items()
+        }
+
+    async def _run_session(self, session: ConversationSession):
+        for event in self.events:
+            await session.step(event)
+
+    async def run(self) -> Dict[str, Dict]:
+        await asyncio.gather(*(self._run_session(s) for s in self.sessions.values()))
+        return {
+            name: {
+                "turns": [t.__dict__ for t in session.turns],
+                "latency_profile": session.latency_profile()
+            }
+            for name, session in self.sessions.items()
+        }
+
+
+if __name__ == "__main__":
+    import json
+    from scenarios.natural_disaster import get_earthquake_scenario
+
+    results = asyncio.run(SessionRunner("Earthquake Response", get_earthquake_scenario()).run())
+    for model_name, result in results.items():
+        profile = result["latency_profile"]
+        print(f"{model_name}: {profile['turns']} turns, "
+              f"{profile['seconds_per_1k_tokens']:.3f}s per 1k context tokens, "
+              f"last/first latency {profile['degradation_ratio']:.2f}x")
+    with open("session_results.json", "w") as f:
+        json.dump(results, f, indent=2, default=str)
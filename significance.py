@@ -0,0 +1,258 @@
+import json
+import math
+import time
+import warnings
+from dataclasses import dataclass
+from itertools import combinations
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from utils.evaluator import EnhancedMetrics
+
+METRIC_NAMES = list(EnhancedMetrics.__dataclass_fields__)
+OVERALL = "overall"  # Per-response mean over every metric, what the dashboard ranks models by
+
+# Inverse CDF of Poisson(1) sampled at 2**16 levels: maps uniform uint16 draws straight to resample weights
+_POISSON_CDF = np.cumsum([math.exp(-1) / math.factorial(k) for k in range(20)])
+_POISSON_WEIGHTS = np.searchsorted(_POISSON_CDF, (np.arange(2 ** 16) + 0.5) / 2 ** 16).astype(np.float32)
+
+
+def _quietly(func, *args, **kwargs):
+    # All-NaN columns (a model with no results under the current filter) are expected
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        return func(*args, **kwargs)
+
+
+def load_results(path: str) -> List[Dict]:
+    """Flat result rows from a WorkQueue database or a Coordinator.merge_results JSON file"""
+    if path.endswith(".db"):
+        from utils.distributed import WorkQueue
+        queue = WorkQueue(path)
+        try:
+            return queue.results()
+        finally:
+            queue.close()
+    with open(path) as f:
+        merged = json.load(f)
+    return [result for by_model in merged.values() for results in by_model.values() for result in results]
+
+
+@dataclass
+class ScoreTable:
+    """Scores as an events x models x metrics array, NaN where a model has no result for an event"""
+    events: List[Tuple[str, int]]
+    models: List[str]
+    metrics: List[str]
+    values: np.ndarray
+
+    @classmethod
+    def from_results(cls, results: List[Dict]) -> "ScoreTable":
+        event_ids: Dict[Tuple[str, int], int] = {}
+        model_ids: Dict[str, int] = {}
+        rows = np.array([event_ids.setdefault((r["scenario"], r["event_index"]), len(event_ids)) for r in results],
+                        dtype=np.int64)
+        cols = np.array([model_ids.setdefault(r["model"], len(model_ids)) for r in results], dtype=np.int64)
+        scores = np.array([[r["metrics"].get(m, np.nan) for m in METRIC_NAMES] for r in results], dtype=np.float64)
+        scores = scores.reshape(len(results), len(METRIC_NAMES))
+
+        values = np.full((len(event_ids), len(model_ids), len(METRIC_NAMES) + 1), np.nan)
+        values[rows, cols, :-1] = scores
+        values[rows, cols, -1] = _quietly(np.nanmean, scores, axis=1)
+        return cls(list(event_ids), list(model_ids), METRIC_NAMES + [OVERALL], values)
+
+    @property
+    def scenarios(self) -> List[str]:
+        return sorted({scenario for scenario, _ in self.events})
+
+    def subset(self, scenarios: Optional[Sequence[str]] = None, models: Optional[Sequence[str]] = None,
+               metrics: Optional[Sequence[str]] = None) -> "ScoreTable":
+        event_rows = [i for i, (s, _) in enumerate(self.events) if scenarios is None or s in scenarios]
+        model_cols = [i for i, m in enumerate(self.models) if models is None or m in models]
+        metric_cols = [i for i, m in enumerate(self.metrics) if metrics is None or m in metrics]
+        return ScoreTable(
+            [self.events[i] for i in event_rows],
+            [self.models[i] for i in model_cols],
+            [self.metrics[i] for i in metric_cols],
+            self.values[np.ix_(event_rows, model_cols, metric_cols)]
+        )
+
+
+def holm_adjust(p_values: np.ndarray) -> np.ndarray:
+    """Holm-Bonferroni adjusted p-values for a family of tests"""
+    p = np.nan_to_num(np.asarray(p_values, dtype=np.float64), nan=1.0)
+    order = np.argsort(p)
+    adjusted = np.minimum(np.maximum.accumulate((len(p) - np.arange(len(p))) * p[order]), 1.0)
+    result = np.empty_like(p)
+    result[order] = adjusted
+    return result
+
+
+class SignificanceEngine:
+    """Bootstrap confidence intervals and paired model comparisons over a ScoreTable.
+
+    Events are the resampling unit, so every model is compared on the same
+    resampled events (a paired bootstrap). Resamples use Poisson(1) weights
+    per event, drawn as an n_resamples x events matrix, so all column means
+    come from one matrix product per block of resamples rather than a
+    Python loop per resample or per group.
+    """
+
+    def __init__(self, table: ScoreTable, n_resamples: int = 2000, confidence: float = 0.95,
+                 seed: int = 0, block_size: int = 250):
+        self.table = table
+        self.n_resamples = n_resamples
+        self.confidence = confidence
+        self.seed = seed
+        self.block_size = block_size
+
+    def _bootstrap_means(self, columns: np.ndarray) -> np.ndarray:
+        """n_resamples x C bootstrap means of the (events x C) columns, ignoring NaNs"""
+        n_events, n_columns = columns.shape
+        means = np.full((self.n_resamples, n_columns), np.nan)
+        if not n_events:
+            return means
+        present = ~np.isnan(columns)
+        filled = np.where(present, columns, 0.0).astype(np.float32)
+        present = present.astype(np.float32)
+        # Same seed for every call, so intervals don't shift when filters change unrelated columns
+        rng = np.random.default_rng(self.seed)
+        for start in range(0, self.n_resamples, self.block_size):
+            size = min(self.block_size, self.n_resamples - start)
+            weights = _POISSON_WEIGHTS[rng.integers(0, 2 ** 16, size=(size, n_events), dtype=np.uint16)]
+            with np.errstate(invalid="ignore", divide="ignore"):
+                means[start:start + size] = (weights @ filled) / (weights @ present)
+        return means
+
+    def _interval(self, samples: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        alpha = (1 - self.confidence) / 2
+        low, high = _quietly(np.nanquantile, samples, [alpha, 1 - alpha], axis=0)
+        return low, high
+
+    def _groups(self, by_scenario: bool) -> List[Tuple[Optional[str], ScoreTable]]:
+        if not by_scenario:
+            return [(None, self.table)]
+        return [(s, self.table.subset(scenarios=[s])) for s in self.table.scenarios]
+
+    def confidence_intervals(self, by_scenario: bool = False) -> pd.DataFrame:
+        """Mean and bootstrap CI per (scenario,) model and metric"""
+        frames = []
+        for scenario, table in self._groups(by_scenario):
+            n_events, n_models, n_metrics = table.values.shape
+            columns = table.values.reshape(n_events, n_models * n_metrics)
+            low, high = self._interval(self._bootstrap_means(columns))
+            mean = _quietly(np.nanmean, columns, axis=0)
+            frame = pd.DataFrame({
+                "model": np.repeat(table.models, n_metrics),
+                "metric": np.tile(table.metrics, n_models),
+                "mean": mean,
+                "ci_low": low,
+                "ci_high": high,
+                "n": (~np.isnan(columns)).sum(axis=0)
+            })
+            if by_scenario:
+                frame.insert(0, "scenario", scenario)
+            frames.append(frame)
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+    def paired_tests(self, by_scenario: bool = False, metrics: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """Paired bootstrap test of the mean difference for every model pair and metric.
+
+        p_adjusted applies Holm's correction across every test in the returned frame.
+        """
+        frames = []
+        for scenario, table in self._groups(by_scenario):
+            if metrics is not None:
+                table = table.subset(metrics=metrics)
+            pairs = list(combinations(range(len(table.models)), 2))
+            if not pairs:
+                continue
+            n_events, _, n_metrics = table.values.shape
+            first, second = zip(*pairs)
+            # events x pairs x metrics, NaN unless both models scored the event
+            diffs = (table.values[:, list(first), :] - table.values[:, list(second), :]).reshape(n_events, -1)
+            samples = self._bootstrap_means(diffs)
+            low, high = self._interval(samples)
+            valid = ~np.isnan(samples)
+            resampled = np.maximum(valid.sum(axis=0), 1)
+            below = ((samples <= 0) & valid).sum(axis=0) / resampled
+            above = ((samples >= 0) & valid).sum(axis=0) / resampled
+            p_value = np.minimum(2 * np.minimum(below, above), 1.0)
+            n = (~np.isnan(diffs)).sum(axis=0)
+            p_value[n == 0] = np.nan
+            mean_diff = _quietly(np.nanmean, diffs, axis=0)
+            frame = pd.DataFrame({
+                "model_a": np.repeat([table.models[a] for a in first], n_metrics),
+                "model_b": np.repeat([table.models[b] for b in second], n_metrics),
+                "metric": np.tile(table.metrics, len(pairs)),
+                "mean_diff": mean_diff,
+                "ci_low": low,
+                "ci_high": high,
+                "p_value": p_value,
+                "n": n
+            })
+            if by_scenario:
+                frame.insert(0, "scenario", scenario)
+            frames.append(frame)
+        if not frames:
+            return pd.DataFrame()
+        tests = pd.concat(frames, ignore_index=True)
+        tests["p_adjusted"] = holm_adjust(tests["p_value"].to_numpy())
+        tests["significant"] = tests["p_adjusted"] < 1 - self.confidence
+        return tests
+
+
+def _synthetic_results(n_rows: int, models: Sequence[str] = ("claude", "gpt4", "gemini", "llama"),
+                       scenarios: Sequence[str] = ("natural_disaster", "medical_triage", "infrastructure_crisis"),
+                       seed: int = 0) -> List[Dict]:
+    rng = np.random.default_rng(seed)
+    n_events = n_rows // len(models)
+    offsets = np.linspace(0.05, -0.05, len(models))
+    results = []
+    for event in range(n_events):
+        scenario = scenarios[event % len(scenarios)]
+        base = rng.uniform(0.5, 0.9)
+        for model, offset in zip(models, offsets):
+            scores = np.clip(base + offset + rng.normal(0, 0.1, len(METRIC_NAMES)), 0, 1)
+            results.append({"scenario": scenario, "event_index": event, "model": model,
+                            "metrics": dict(zip(METRIC_NAMES, scores.tolist()))})
+    return results
+
+
+def benchmark(n_rows: int = 100_000, n_resamples: int = 2000) -> Dict[str, float]:
+    """Time table construction, CIs and paired tests on synthetic results (target: sub-second per call)"""
+    results = _synthetic_results(n_rows)
+    start = time.perf_counter()
+    table = ScoreTable.from_results(results)
+    built = time.perf_counter()
+    engine = SignificanceEngine(table, n_resamples=n_resamples)
+    engine.confidence_intervals()
+    engine.confidence_intervals(by_scenario=True)
+    intervals = time.perf_counter()
+    engine.paired_tests(metrics=[OVERALL])
+    tested = time.perf_counter()
+    return {"rows": len(results), "resamples": n_resamples, "build_s": built - start,
+            "intervals_s": intervals - built, "paired_overall_s": tested - intervals}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Bootstrap CIs and paired model comparisons over stored results")
+    parser.add_argument("results", nargs="?", default="distributed_results.json")
+    parser.add_argument("--resamples", type=int, default=2000)
+    parser.add_argument("--metric", default=OVERALL)
+    parser.add_argument("--by-scenario", action="store_true")
+    parser.add_argument("--benchmark", action="store_true", help="Time the engine on 100k synthetic rows")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        print(benchmark(n_resamples=args.resamples))
+    else:
+        engine = SignificanceEngine(ScoreTable.from_results(load_results(args.results)), n_resamples=args.resamples)
+        intervals = engine.confidence_intervals(args.by_scenario)
+        print(intervals[intervals["metric"] == args.metric].to_string(index=False))
+        print()
+        print(engine.paired_tests(args.by_scenario, metrics=[args.metric]).to_string(index=False))
@@ -0,0 +1,28 @@
+import math
+
+from utils.evaluator import EnhancedEvaluator
+from utils.score_cache import METRIC_NAMES, CachedScorer, ScoreCache, scorer_version
+
+
+def test_cached_scorer_round_trips_scores(tmp_path):
+    scorer = CachedScorer(EnhancedEvaluator("smoke", client=None), ScoreCache(str(tmp_path / "scores.db")))
+    assert set(scorer.versions) == set(METRIC_NAMES)
+
+    # Everything but response_quality, which would load the classifier
+    metrics = [m for m in METRIC_NAMES if m != "response_quality"]
+    holder = {}
+    values = {m: scorer._compute(m, {"response": ""}, {}, holder) for m in metrics}
+    scorer.cache.put_many("response", "context", values, scorer.versions)
+    cached = scorer.cache.get_many("response", "context", scorer.versions)
+    assert math.isnan(cached["reasoning_depth"])
+    assert cached["safety_consideration"] == values["safety_consideration"]
+
+
+def test_lexical_versions_cover_every_lexicon(monkeypatch):
+    from utils import text_analyzer
+
+    evaluator = EnhancedEvaluator("smoke", client=None)
+    before = scorer_version(evaluator, "safety_consideration")
+    monkeypatch.setitem(text_analyzer.LEXICONS, "innovation",
+                        text_analyzer.LEXICONS["innovation"] + ["safe evacuation route"])
+    assert scorer_version(evaluator, "safety_consideration") != before
@@ -0,0 +1,121 @@
+import re
+import string
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set
+
+from utils.tokenization import TokenizedResponse, tokenize_responses
+
+# Term lists per dimension. Entries ending in "*" match as prefixes (e.g. "evacuat*").
+LEXICONS: Dict[str, List[str]] = {
+    "safety_consideration": [
+        "safety", "safe", "evacuat*", "protect*", "injur*", "secure", "first aid",
+        "hazard*", "shelter*", "ppe", "casualt*"
+    ],
+    "ethical_alignment": [
+        "ethic*", "fair*", "equit*", "dignity", "consent", "transparen*", "rights",
+        "justice", "do no harm", "vulnerable", "without discrimination", "accountab*"
+    ],
+    "decisiveness": [
+        "immediately", "must", "will", "deploy*", "prioritize", "priority", "allocate",
+        # Not "decision": every prompt asks for a DECISION section, so it would match every response
+        "order", "direct", "dispatch*", "commit*"
+    ],
+    "hedging": [
+        "might", "may", "perhaps", "possibly", "maybe", "unclear", "it depends",
+        "could consider", "not sure", "hard to say"
+    ],
+    "innovation": [
+        "alternative*", "novel", "innovat*", "creative*", "repurpos*", "improvis*",
+        "unconventional", "drone*", "temporary", "makeshift", "instead", "workaround*"
+    ],
+    "risk_assessment": [
+        "risk*", "hazard*", "threat*", "likelihood", "probab*", "worst case", "contingenc*",
+        "mitigat*", "vulnerabilit*", "uncertain*", "trade-off*", "tradeoff*"
+    ],
+    "stakeholder_consideration": [
+        "children", "elderly", "patients", "families", "residents", "staff", "responders",
+        "volunteers", "community", "communities", "public", "authorities", "disabled",
+        "hospitals", "schools", "businesses", "media"
+    ],
+    "long_term_thinking": [
+        "long-term", "long term", "recovery", "rebuild*", "future", "sustainab*", "weeks",
+        "months", "prevent*", "aftermath", "resilien*", "follow-up", "lessons learned"
+    ]
+}
+
+_PUNCTUATION = string.punctuation.replace("'", "").replace("-", "")
+
+
+def _build_index(lexicons: Dict[str, List[str]]):
+    exact: Dict[str, Set[str]] = defaultdict(set)
+    prefixes: Dict[str, Set[str]] = defaultdict(set)
+    for category, terms in lexicons.items():
+        for term in terms:
+            if term.endswith("*"):
+                prefixes[term[:-1]].add(category)
+            else:
+                exact[term].add(category)
+    alternatives = [re.escape(t) for t in exact] + [re.escape(p) + r"[a-z'-]*" for p in prefixes]
+    # Longest alternatives first so "long term" wins over shorter overlapping terms
+    pattern = re.compile(r"\b(" + "|".join(sorted(alternatives, key=len, reverse=True)) + r")\b")
+    return pattern, dict(exact), dict(prefixes)
+
+
+_PATTERN, _EXACT, _PREFIXES = _build_index(LEXICONS)
+_match_categories: Dict[str, Set[str]] = {}
+
+
+@dataclass
+class TextAnalysis:
+    """Everything the lexical scorers need, computed in one pass over a response"""
+    text: str
+    num_sentences: int
+    words: List[str]
+    # category -> distinct matched terms / sentence indices containing a match / total matches
+    terms: Dict[str, Set[str]] = field(default_factory=lambda: defaultdict(set))
+    sentences: Dict[str, Set[int]] = field(default_factory=lambda: defaultdict(set))
+    counts: Dict[str, int] = field(default_factory=lambda: defaultdict(int))
+
+    @property
+    def type_token_ratio(self) -> float:
+        return len(set(self.words)) / len(self.words) if self.words else 0.0
+
+    def coverage(self, category: str, saturation: int = 4, sentence_target: float = 0.3) -> float:
+        """Blend of distinct-term breadth and the share of sentences touching the category"""
+        breadth = min(len(self.terms[category]) / saturation, 1.0)
+        spread = len(self.sentences[category]) / max(self.num_sentences, 1)
+        return breadth * 0.6 + min(spread / sentence_target, 1.0) * 0.4
+
+
+def _categories_for(match: str) -> Set[str]:
+    # Matched words repeat heavily across responses, so memoize the lookup
+    if match not in _match_categories:
+        categories = set(_EXACT.get(match, ()))
+        for prefix, prefix_categories in _PREFIXES.items():
+            if match.startswith(prefix):
+                categories |= prefix_categories
+        _match_categories[match] = categories
+    return _match_categories[match]
+
+
+def analyze_text(text: str, tokenized: Optional[TokenizedResponse] = None) -> TextAnalysis:
+    """Match every lexicon in a single scan, reusing the response's word and sentence split.
+
+    Words and sentences come from tokenize_responses (pass the response's
+    TokenizedResponse to avoid splitting again), so lexical spread and
+    reasoning depth count sentences the same way.
+    """
+    if tokenized is None:
+        tokenized = tokenize_responses([text])[0]
+    lowered = text.lower()
+    # Word spans keep attached punctuation ("hospitals,"); strip it so variants count as one type
+    words = [lowered[start:end].strip(_PUNCTUATION) for start, end in tokenized.word_offsets]
+    analysis = TextAnalysis(lowered, tokenized.sentence_count, [word for word in words if word])
+    for match in _PATTERN.finditer(lowered):
+        sentence = tokenized.sentence_index(match.start())
+        for category in _categories_for(match.group(1)):
+            analysis.terms[category].add(match.group(1))
+            analysis.sentences[category].add(sentence)
+            analysis.counts[category] += 1
+    return analysis
@@ -0,0 +1,113 @@
+import math
+import re
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from utils.profiling import profiler
+
+# Words as the sentence-length heuristics count them: whitespace-separated, with '.' also ending a word
+_WORD_SPAN = re.compile(r"[^\s.]+")
+_NONEMPTY_SENTENCE = re.compile(r"[^.]*[^.\s][^.]*")
+
+
+@dataclass
+class TokenizedResponse:
+    """One response tokenized once for both the classifier and the heuristic scorers"""
+    text: str
+    word_offsets: np.ndarray  # n_words x 2 character spans
+    sentence_starts: np.ndarray  # start offset of each non-empty '.'-delimited sentence
+    input_ids: Optional[List[int]] = None  # classifier subword ids with special tokens, never truncated
+    offsets: Optional[List[Tuple[int, int]]] = None  # character span of each subword id
+
+    @property
+    def words(self) -> List[str]:
+        return [self.text[start:end] for start, end in self.word_offsets]
+
+    @property
+    def sentence_count(self) -> int:
+        return len(self.sentence_starts)
+
+    def sentence_index(self, offset: int) -> int:
+        """Index of the sentence containing character `offset`"""
+        return max(int(np.searchsorted(self.sentence_starts, offset, side="right")) - 1, 0)
+
+    @property
+    def avg_sentence_length(self) -> float:
+        # Total words / non-empty sentences == mean words per non-empty sentence
+        return len(self.word_offsets) / self.sentence_count if self.sentence_count else math.nan
+
+
+def tokenize_responses(texts: Sequence[str], tokenizer=None) -> List[TokenizedResponse]:
+    """Word spans for every text, plus subword ids when a fast tokenizer is given.
+
+    The whole list goes to the tokenizer in one call, which a fast (Rust)
+    tokenizer encodes in parallel across cores (see TOKENIZERS_PARALLELISM).
+    """
+    with profiler.span("tokenize.words"):
+        responses = [
+            TokenizedResponse(
+                text,
+                np.array([m.span() for m in _WORD_SPAN.finditer(text)], dtype=np.int64).reshape(-1, 2),
+                np.array([m.start() for m in _NONEMPTY_SENTENCE.finditer(text)], dtype=np.int64)
+            )
+            for text in texts
+        ]
+    if tokenizer is not None and responses:
+        with profiler.span("tokenize.subwords"):
+            encoded = tokenizer(list(texts), truncation=False, return_attention_mask=False,
+                                return_offsets_mapping=True, verbose=False)
+        for response, ids, offsets in zip(responses, encoded["input_ids"], encoded["offset_mapping"]):
+            response.input_ids = ids
+            response.offsets = offsets
+    return responses
+
+
+def classifier_windows(responses: Sequence[TokenizedResponse], window: int = 512,
+                       overlap: Optional[int] = None) -> Tuple[List[List[int]], np.ndarray]:
+    """Classifier inputs of at most `window` ids each, and the response index of each input.
+
+    With overlap=None every response is cut to its first window, like
+    tokenizing with truncation=True. Otherwise long responses become several
+    windows sharing `overlap` ids with their neighbour. Assumes one leading
+    and one trailing special token per sequence (BERT/RoBERTa-style models).
+    """
+    body = window - 2
+    if overlap is not None and not 0 <= overlap < body:
+        # Windows must advance by at least one id or the split never finishes
+        raise ValueError(f"overlap must be in [0, {body}) for window={window}, got {overlap}")
+    inputs, owners = [], []
+    for index, response in enumerate(responses):
+        ids = response.input_ids
+        content = ids[1:-1]
+        if len(content) <= body:
+            inputs.append(ids)
+            owners.append(index)
+            continue
+        if overlap is None:
+            inputs.append(ids[:window - 1] + ids[-1:])
+            owners.append(index)
+            continue
+        start = 0
+        while True:
+            inputs.append(ids[:1] + content[start:start + body] + ids[-1:])
+            owners.append(index)
+            if start + body >= len(content):
+                break
+            start += body - overlap
+    return inputs, np.array(owners, dtype=np.int64)
+
+
+def classify_windows(tokenizer, model, inputs: List[List[int]], batch_size: int = 32) -> np.ndarray:
+    """Positive-class probability for each pre-tokenized input, padding batch_size inputs at a time"""
+    from scipy.special import softmax
+    import torch
+
+    scores = []
+    with torch.no_grad():
+        for start in range(0, len(inputs), batch_size):
+            batch = tokenizer.pad({"input_ids": inputs[start:start + batch_size]}, return_tensors="pt")
+            logits = model(**batch).logits.numpy()
+            scores.append(softmax(logits, axis=1)[:, 1])
+    return np.concatenate(scores) if scores else np.zeros(0)
@@ -2,7 +2,11 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
+import os
 from datetime import datetime, timedelta
+from utils.cost_ledger import CostLedger
+from utils.live_feed import LiveAggregate, LiveFeed
+from utils.significance import METRIC_NAMES, OVERALL, ScoreTable, SignificanceEngine, load_results
 
 # Set page config
 st.set_page_config(
@@ -102,13 +106,88 @@ eval_data = {
     }
 }
 
+# Replace the hardcoded numbers with stored run results, with bootstrap confidence intervals
+@st.cache_data
+def load_score_table(path: str, modified: float) -> ScoreTable:
+    return ScoreTable.from_results(load_results(path))
+
+@st.cache_data
+def compute_significance(path: str, modified: float, selected_scenarios: tuple, selected_models: tuple,
+                         n_resamples: int):
+    table = load_score_table(path, modified).subset(scenarios=selected_scenarios, models=selected_models)
+    engine = SignificanceEngine(table, n_resamples=n_resamples)
+    return (engine.confidence_intervals(),
+            engine.confidence_intervals(by_scenario=True),
+            engine.paired_tests(metrics=[OVERALL]))
+
+@st.cache_data
+def load_ledger(path: str, modified: float, selected_scenarios: tuple, selected_models: tuple) -> CostLedger:
+    return CostLedger.from_results([
+        result for result in load_results(path)
+        if result["scenario"] in selected_scenarios and result["model"] in selected_models
+    ])
+
+def live_run_panel(feed_path: str):
+    # Only rows newer than the last offset are read, so each refresh costs the same however long the run gets
+    if st.session_state.get("live_feed_path") != feed_path:
+        st.session_state.live_feed_path = feed_path
+        st.session_state.live_aggregate = LiveAggregate()
+    aggregate = st.session_state.live_aggregate
+    feed = LiveFeed(feed_path)
+    try:
+        aggregate.update(feed.read_since(aggregate.offset))
+    finally:
+        feed.close()
+    
+    live_cols = st.columns(3)
+    live_cols[0].metric("Feed Rows", f"{aggregate.rows:,}")
+    live_cols[1].metric("Scored Events", f"{sum(aggregate.results.values()):,}")
+    live_cols[2].metric("Failures", f"{sum(aggregate.failures.values()):,}")
+    
+    summary = aggregate.model_summary()
+    if summary:
+        st.dataframe(pd.DataFrame.from_dict(summary, orient="index"))
+    if aggregate.recent:
+        st.subheader("Latest Results")
+        st.dataframe(pd.DataFrame([
+            {"Model": row["model"], "Scenario": row["scenario"], "Event": row["event_index"],
+             "Latency (s)": row["latency"], **row["payload"]["metrics"]}
+            for row in aggregate.recent
+        ]))
+
+# st.fragment reruns just this panel on a timer; older Streamlit falls back to a manual refresh
+if hasattr(st, "fragment"):
+    live_run_panel = st.fragment(run_every=2)(live_run_panel)
+
+results_path = st.sidebar.text_input("Results file (merged JSON or queue .db)", "distributed_results.json")
+live_feed_path = st.sidebar.text_input("Live feed (STRESSTEST_LIVE_FEED)", "live_feed.db")
+intervals = scenario_intervals = pair_tests = None
+if os.path.exists(results_path):
+    modified = os.path.getmtime(results_path)
+    score_table = load_score_table(results_path, modified)
+    selected_scenarios = st.sidebar.multiselect("Scenarios", score_table.scenarios, default=score_table.scenarios)
+    selected_models = st.sidebar.multiselect("Models", score_table.models, default=score_table.models)
+    n_resamples = st.sidebar.select_slider("Bootstrap resamples", [500, 1000, 2000, 5000], value=2000)
+    if not selected_scenarios or not selected_models:
+        st.warning("Select at least one scenario and one model.")
+        st.stop()
+    intervals, scenario_intervals, pair_tests = compute_significance(
+        results_path, modified, tuple(selected_scenarios), tuple(selected_models), n_resamples
+    )
+    metric_means = intervals[intervals["metric"] != OVERALL].pivot(index="model", columns="metric", values="mean")
+    eval_data = metric_means.reindex(index=selected_models, columns=METRIC_NAMES).to_dict(orient="index")
+else:
+    st.sidebar.info(f"No results at {results_path}; showing sample data.")
+
 # Create tabs for different views
-tab1, tab2, tab3, tab4, tab5 = st.tabs([
+tab1, tab2, tab3, tab4, tab5, tab6, tab7 = st.tabs([
     "Overall Performance", 
     "Scenario Analysis", 
     "Detailed Metrics",
     "Safety Analysis",
-    "Interactive Testing"
+    "Interactive Testing",
+    "Cost & Throughput",
+    "Live Run"
 ])
 
 with tab1:
@@ -119,10 +198,10 @@ with tab1:
     
     with col1:
         # Radar chart for key metrics
-        categories = list(eval_data["Claude 3"].keys())
+        categories = list(next(iter(eval_data.values())).keys())
         fig = go.Figure()
         
-        for model in models:
+        for model in eval_data:
             values = list(eval_data[model].values())
             values.append(values[0])  # Duplicate first value to close the polygon
             
@@ -136,7 +215,7 @@ with tab1:
             polar=dict(
                 radialaxis=dict(
                     visible=True,
-                    range=[0.7, 1]
+                    range=[0.7, 1] if intervals is None else [0, 1]
                 )),
             showlegend=True,
             title="Model Capabilities Comparison"
@@ -146,33 +225,59 @@ with tab1:
     with col2:
         # Average scores
         st.subheader("Average Performance Scores")
-        avg_scores = {model: sum(metrics.values()) / len(metrics) 
-                     for model, metrics in eval_data.items()}
-        
-        for model, score in avg_scores.items():
-            st.metric(model, f"{score:.2%}")
+        if intervals is None:
+            avg_scores = {model: sum(metrics.values()) / len(metrics) 
+                         for model, metrics in eval_data.items()}
+            
+            for model, score in avg_scores.items():
+                st.metric(model, f"{score:.2%}")
+        else:
+            overall = intervals[intervals["metric"] == OVERALL].set_index("model")
+            avg_scores = overall["mean"].to_dict()
+            for model, row in overall.iterrows():
+                st.metric(model, f"{row['mean']:.2%}",
+                          help=f"95% CI {row['ci_low']:.2%} to {row['ci_high']:.2%} over {row['n']} events")
+
+    if pair_tests is not None and not pair_tests.empty:
+        with st.expander("Pairwise Significance (paired bootstrap, Holm-adjusted)"):
+            st.dataframe(pair_tests.drop(columns="metric").style.format({
+                "mean_diff": "{:+.3f}", "ci_low": "{:+.3f}", "ci_high": "{:+.3f}",
+                "p_value": "{:.4f}", "p_adjusted": "{:.4f}"
+            }))
 
 with tab2:
     # Scenario-specific analysis
     st.header("Scenario-specific Performance")
     
-    # Hardcoded scenario performance data
-    scenario_data = pd.DataFrame({
-        'Scenario': scenarios * len(models),
-        'Model': [model for model in models for _ in scenarios],
-        'Performance': [
-            0.94, 0.92, 0.93, 0.91,  # Claude 3
-            0.89, 0.90, 0.88, 0.87,  # GPT-4
-            0.85, 0.84, 0.86, 0.83,  # Gemini Pro
-            0.81, 0.80, 0.82, 0.79   # Llama 2
-        ]
-    })
+    # Scenario performance from stored results, falling back to hardcoded sample data
+    if scenario_intervals is not None:
+        overall = scenario_intervals[scenario_intervals["metric"] == OVERALL]
+        scenario_data = pd.DataFrame({
+            'Scenario': overall["scenario"],
+            'Model': overall["model"],
+            'Performance': overall["mean"],
+            'CI Above': overall["ci_high"] - overall["mean"],
+            'CI Below': overall["mean"] - overall["ci_low"]
+        })
+    else:
+        scenario_data = pd.DataFrame({
+            'Scenario': scenarios * len(models),
+            'Model': [model for model in models for _ in scenarios],
+            'Performance': [
+                0.94, 0.92, 0.93, 0.91,  # Claude 3
+                0.89, 0.90, 0.88, 0.87,  # GPT-4
+                0.85, 0.84, 0.86, 0.83,  # Gemini Pro
+                0.81, 0.80, 0.82, 0.79   # Llama 2
+            ]
+        })
     
     fig = px.bar(scenario_data, 
                  x='Scenario', 
                  y='Performance', 
                  color='Model',
                  barmode='group',
+                 error_y='CI Above' if scenario_intervals is not None else None,
+                 error_y_minus='CI Below' if scenario_intervals is not None else None,
                  title="Performance Across Different Scenarios")
     st.plotly_chart(fig, use_container_width=True)
 
@@ -372,6 +477,52 @@ with tab5:
     else:
         st.info("No tests run yet. Run a test to see history.")
 
+with tab6:
+    st.header("Cost & Token Accounting")
+    
+    if intervals is None:
+        st.info("No run results loaded. Run a sweep with distributed.py to see token usage and cost.")
+    else:
+        ledger = load_ledger(results_path, modified, tuple(selected_scenarios), tuple(selected_models))
+        run_totals = ledger.totals(by=())[()] if ledger.entries else None
+        if run_totals is None:
+            st.info("No provider calls recorded for this selection.")
+        else:
+            cost_cols = st.columns(4)
+            cost_cols[0].metric("Total Cost", f"${run_totals['cost']:.2f}")
+            cost_cols[1].metric("Tokens (in / out)",
+                                f"{run_totals['input_tokens']:,} / {run_totals['output_tokens']:,}")
+            cost_cols[2].metric("Output Tokens/sec", f"{run_totals['tokens_per_second']:.1f}")
+            cost_cols[3].metric("Cost per Metric Point", f"${run_totals['cost_per_metric_point']:.4f}")
+            
+            by_provider = pd.DataFrame.from_dict(
+                {key[0]: totals for key, totals in ledger.totals(by=("provider",)).items()}, orient="index"
+            )
+            fig = px.bar(by_provider.reset_index(), x="index", y="cost_per_metric_point",
+                         labels={"index": "Model", "cost_per_metric_point": "USD per metric point"},
+                         title="Cost per Metric Point (Lower is Better)")
+            st.plotly_chart(fig, use_container_width=True)
+            st.dataframe(by_provider)
+            
+            st.subheader("Cost per Scenario")
+            by_scenario = pd.DataFrame([
+                {"Scenario": scenario, "Model": provider, **totals}
+                for (scenario, provider), totals in ledger.totals(by=("scenario", "provider")).items()
+            ])
+            fig = px.bar(by_scenario, x="Scenario", y="cost", color="Model", barmode="group",
+                         title="Cost by Scenario (USD)")
+            st.plotly_chart(fig, use_container_width=True)
+
+with tab7:
+    st.header("Live Run")
+    
+    if not os.path.exists(live_feed_path):
+        st.info("No live feed yet. Set STRESSTEST_LIVE_FEED for workers (or pass --live-feed to loadtest.py).")
+    else:
+        if not hasattr(st, "fragment"):
+            st.button("Refresh")
+        live_run_panel(live_feed_path)
+
 # Footer
 st.markdown("---")
 st.markdown("*Dashboard created for AI Safety Initiative @ GT Hackathon*")